@@ -1,93 +1,653 @@
-import os
-import json
-import pickle
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
-from google.auth.transport.requests import Request
-from google.auth.exceptions import RefreshError
-
-# OAuth 2.0 scopes for Blogger API
-SCOPES = ['https://www.googleapis.com/auth/blogger']
-
-# Your Blogger Blog ID
-BLOG_ID = '8223935102652440723'
-
-# Token pickle file to cache access tokens
-TOKEN_PICKLE_FILE = 'token.pickle'
-
-def authenticate():
-    creds = None
-    
-    # Try service account first (GitHub Actions)
-    service_account_json = os.getenv('GOOGLE_SERVICE_ACCOUNT')
-    if service_account_json:
-        try:
-            info = json.loads(service_account_json)
-            creds = service_account.Credentials.from_service_account_info(
-                info, scopes=SCOPES
-            )
-            print("✅ Using Service Account (GitHub Actions)")
-        except Exception as e:
-            print(f"Service account failed: {e}")
-    
-    # Fallback: Local OAuth flow (your desktop)
-    else:
-        # Check if we have saved credentials
-        if os.path.exists(TOKEN_PICKLE_FILE):
-            with open(TOKEN_PICKLE_FILE, 'rb') as token:
-                creds = pickle.load(token)
-
-        # If no valid credentials, go through OAuth flow (LOCAL ONLY)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                from google_auth_oauthlib.flow import InstalledAppFlow
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    'credentials.json', SCOPES)
-                creds = flow.run_local_server(port=8080)
-            
-            # Save credentials for next run
-            with open(TOKEN_PICKLE_FILE, 'wb') as token:
-                pickle.dump(creds, token)
-            print("✅ Local OAuth flow completed")
-
-    return build('blogger', 'v3', credentials=creds)
-
-def post_to_blogger(service, title, html_content, labels=["#FreeKindleBooks", "Kindle Tamil Free Books"]):
-    body = {
-        "kind": "blogger#post",
-        "blog": {"id": BLOG_ID},
-        "title": title,
-        "content": html_content
-    }
-    
-    if labels:
-        body["labels"] = labels
-
-    post = service.posts().insert(blogId=BLOG_ID, body=body).execute()
-    print(f'✅ Post published: {post["url"]}')
-
-def main():
-    # Authenticate and create Blogger API client
-    service = authenticate()
-
-    # Read your daily generated HTML file
-    html_file = 'output.html'
-    if not os.path.exists(html_file):
-        print(f"❌ HTML file '{html_file}' not found.")
-        return
-
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-
-    # Use current date for post title
-    from datetime import datetime
-    today_str = datetime.now().strftime("%d-%m-%Y")
-    post_title = f"Free Kindle Books Tamil Edition {today_str}"
-
-    # Create the blog post
-    post_to_blogger(service, post_title, html_content)
-
-if __name__ == '__main__':
-    main()
+import os
+import re
+import json
+import time
+import queue
+import hashlib
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import NamedTuple, Tuple
+from metrics import metrics
+from profiling import profiled
+from token_cache import TokenCache, TokenRefresher, ensure_fresh, restore_token
+
+# OAuth 2.0 scopes for Blogger API
+SCOPES = ['https://www.googleapis.com/auth/blogger']
+
+# Your Blogger Blog ID
+BLOG_ID = '8223935102652440723'
+
+# Labels attached to every daily post
+DEFAULT_LABELS = ["#FreeKindleBooks", "Kindle Tamil Free Books"]
+
+# "upsert" publishes each day's post once and updates it on reruns; "insert" always adds a new post
+PUBLISH_MODE = os.getenv("BLOGGER_PUBLISH_MODE", "upsert")
+
+# Local index of published post IDs and content hashes
+PUBLISHED_INDEX_FILE = os.getenv("BLOGGER_PUBLISHED_INDEX_FILE", "published_posts.json")
+
+# Post title; {date} becomes today's dd-mm-YYYY
+TITLE_TEMPLATE = "Free Kindle Books Tamil Edition {date}"
+
+# Optional JSON list of blogs to mirror the post to, see load_blog_targets
+BLOG_TARGETS_FILE = os.getenv("BLOGGER_TARGETS_FILE", "blog_targets.json")
+
+# Blogs published to at the same time
+PUBLISH_CONCURRENCY = int(os.getenv("BLOGGER_PUBLISH_CONCURRENCY", "4"))
+
+# In insert mode, send all blogs' inserts as one batched HTTP request
+BATCH_INSERTS = os.getenv("BLOGGER_BATCH", "0") == "1"
+
+# On-disk copy of the Blogger v3 discovery document and how long it stays fresh
+API_VERSION = 'v3'
+DISCOVERY_CACHE_FILE = f'blogger_{API_VERSION}_discovery.json'
+DISCOVERY_MAX_AGE = float(os.getenv("BLOGGER_DISCOVERY_MAX_AGE", str(7 * 24 * 60 * 60)))
+DISCOVERY_URL = f'https://blogger.googleapis.com/$discovery/rest?version={API_VERSION}'
+
+# Set to 0 to never refresh the discovery document over the network
+DISCOVERY_REFRESH = os.getenv("BLOGGER_DISCOVERY_REFRESH", "1") == "1"
+
+# Socket timeout in seconds for Blogger API calls
+BLOGGER_TIMEOUT = float(os.getenv("BLOGGER_TIMEOUT", "60"))
+
+# Service object built once per process and reused by every publish
+_service = None
+_service_lock = threading.Lock()
+_token_refresher = None
+_credentials = None
+_discovery_document = None
+
+# httplib2 connections are not thread-safe, so fan-out workers get their own services;
+# the process-wide one is lent to the first worker that asks
+_thread_services = threading.local()
+_service_owner = None
+
+# Long-lived publish workers; daemon threads, so a publish stuck past its
+# timeout never holds up interpreter exit
+_publish_queue = queue.Queue()
+_publish_workers = []
+_publish_workers_lock = threading.Lock()
+
+def _read_discovery_cache():
+    try:
+        with open(DISCOVERY_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        return cached, time.time() - cached["fetched_at"]
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+def _write_discovery_cache(document):
+    entry = {"revision": document.get("revision"), "fetched_at": time.time(), "document": document}
+    tmp_path = f"{DISCOVERY_CACHE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, DISCOVERY_CACHE_FILE)
+
+def _refresh_discovery_document(cached):
+    # Short timeout: a slow discovery endpoint must not hold up the publish
+    import httplib2
+    response, content = httplib2.Http(timeout=5).request(DISCOVERY_URL)
+    if response.status != 200:
+        raise RuntimeError(f"HTTP {response.status}")
+    document = json.loads(content)
+    if cached.get("revision") == document.get("revision"):
+        print(f"[DEBUG] Blogger discovery document still at revision {document.get('revision')}")
+    else:
+        print(f"[INFO] Blogger discovery document refreshed to revision {document.get('revision')}")
+    _write_discovery_cache(document)
+    return document
+
+def get_discovery_document():
+    # Parsed once per process; every service built afterwards reuses it
+    global _discovery_document
+    if _discovery_document is None:
+        _discovery_document = load_discovery_document()
+    return _discovery_document
+
+def load_discovery_document(refresh=DISCOVERY_REFRESH):
+    """
+    Returns the Blogger discovery document without a network round-trip in
+    the common case. The first run seeds the on-disk cache from the copy
+    bundled with google-api-python-client; once that copy is older than
+    DISCOVERY_MAX_AGE it is refreshed over the network, falling back to the
+    stale copy if the refresh fails, so discovery can never fail the job.
+    """
+    cached, age = _read_discovery_cache()
+    if cached is None:
+        from googleapiclient.discovery_cache import get_static_doc
+        document = json.loads(get_static_doc('blogger', API_VERSION))
+        try:
+            _write_discovery_cache(document)
+        except OSError as e:
+            print(f"[WARNING] Could not cache Blogger discovery document: {e}")
+        return document
+    if age >= DISCOVERY_MAX_AGE and refresh:
+        try:
+            with metrics.timer("blogger_api_seconds", call="discovery"):
+                return _refresh_discovery_document(cached)
+        except Exception as e:
+            print(f"[WARNING] Could not refresh Blogger discovery document: {e}")
+    return cached["document"]
+
+def build_service(creds, timeout=BLOGGER_TIMEOUT):
+    """
+    Builds the Blogger client from the cached discovery document on a
+    keep-alive httplib2 transport authorised with creds.
+    """
+    # The Google client libraries are only imported once something is published
+    import httplib2
+    import google_auth_httplib2
+    from googleapiclient.discovery import build_from_document
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=timeout))
+    return build_from_document(get_discovery_document(), http=http)
+
+def get_thread_service(timeout=BLOGGER_TIMEOUT):
+    """
+    Returns a service for the calling thread with the given socket timeout,
+    sharing the process-wide credentials. The first thread asking for the
+    default timeout gets the process-wide service itself.
+    """
+    global _service_owner
+    service = authenticate()
+    services = getattr(_thread_services, "services", None)
+    if services is None:
+        services = _thread_services.services = {}
+    if timeout not in services:
+        with _service_lock:
+            lend = timeout == BLOGGER_TIMEOUT and _service_owner is None
+            if lend:
+                _service_owner = threading.get_ident()
+        services[timeout] = service if lend else build_service(_credentials, timeout)
+    return services[timeout]
+
+def authenticate(force=False):
+    """
+    Returns the process-wide Blogger service, authenticating and building
+    it on first use only.
+    """
+    global _service, _token_refresher, _credentials
+    with _service_lock:
+        if _service is None or force:
+            with metrics.timer("blogger_api_seconds", call="authenticate"):
+                cache = TokenCache()
+                creds, key = get_credentials(cache)
+                _service = build_service(creds)
+                _credentials = creds
+            # Keep the token fresh in the background for as long as the process lives
+            if _token_refresher:
+                _token_refresher.stop()
+            _token_refresher = TokenRefresher(creds, key, cache).start() if creds else None
+        return _service
+
+def get_credentials(cache):
+    """
+    Returns (credentials, cache key). Cached access tokens are reused until
+    shortly before they expire, for both the service account and the local
+    OAuth path, and are stored as JSON rather than pickled.
+    """
+    from google.oauth2 import service_account
+    from google.oauth2 import credentials as oauth_credentials
+    creds = None
+    key = None
+    
+    # Try service account first (GitHub Actions)
+    service_account_json = os.getenv('GOOGLE_SERVICE_ACCOUNT')
+    if service_account_json:
+        try:
+            info = json.loads(service_account_json)
+            creds = service_account.Credentials.from_service_account_info(
+                info, scopes=SCOPES
+            )
+            key = f"service_account:{info.get('client_email')}"
+            restore_token(creds, cache.get(key))
+            print("✅ Using Service Account (GitHub Actions)")
+        except Exception as e:
+            print(f"Service account failed: {e}")
+    
+    # Fallback: Local OAuth flow (your desktop)
+    else:
+        key = "oauth:local"
+        # Check if we have saved credentials
+        entry = cache.get(key)
+        if entry:
+            creds = oauth_credentials.Credentials.from_authorized_user_info(entry, SCOPES)
+
+        # If no refreshable credentials, go through OAuth flow (LOCAL ONLY)
+        if not creds or not (creds.valid or creds.refresh_token):
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            flow = InstalledAppFlow.from_client_secrets_file(
+                'credentials.json', SCOPES)
+            creds = flow.run_local_server(port=8080)
+            
+            # Save credentials for next run
+            cache.store(key, creds)
+            print("✅ Local OAuth flow completed")
+
+    if creds:
+        ensure_fresh(creds, key, cache)
+    return creds, key
+
+def post_body(title, html_content, labels, blog_id=BLOG_ID):
+    body = {
+        "kind": "blogger#post",
+        "blog": {"id": blog_id},
+        "title": title,
+        "content": html_content
+    }
+    
+    if labels:
+        body["labels"] = list(labels)
+    return body
+
+@profiled("post_to_blogger")
+def post_to_blogger(service, title, html_content, labels=DEFAULT_LABELS, blog_id=BLOG_ID):
+    body = post_body(title, html_content, labels, blog_id)
+
+    with metrics.timer("blogger_api_seconds", call="posts.insert"):
+        post = service.posts().insert(blogId=blog_id, body=body).execute()
+    print(f'✅ Post published: {post["url"]}')
+    return post
+
+def get_post_title(template=TITLE_TEMPLATE):
+    # Use current date for post title
+    from datetime import datetime
+    today_str = datetime.now().strftime("%d-%m-%Y")
+    return template.format(date=today_str)
+
+def content_hash(html_content):
+    return hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+
+class PublishedIndex:
+    """
+    Small local record of the posts we published, keyed by blog, day and
+    part number, with the title and the hash of the content each one was
+    last published with. Keying by part rather than title keeps a part on
+    the same post when the part count, and so its title, changes.
+    """
+    def __init__(self, path=PUBLISHED_INDEX_FILE, today=None):
+        from datetime import date
+        self.path = path
+        self.today = (today or date.today()).isoformat()
+        self._lock = threading.Lock()
+        self.posts = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.posts = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Ignoring unreadable published-post index {path}: {e}")
+
+    def _key(self, blog_id, part):
+        return f"{blog_id}:{self.today}:{part}"
+
+    def get(self, blog_id, part=1):
+        return self.posts.get(self._key(blog_id, part))
+
+    def parts(self, blog_id):
+        """
+        Today's recorded posts of a blog as {part: entry}.
+        """
+        prefix = f"{blog_id}:{self.today}:"
+        return {int(key[len(prefix):]): entry for key, entry in self.posts.items() if key.startswith(prefix)}
+
+    def record(self, blog_id, part, title, post, digest):
+        with self._lock:
+            self.posts[self._key(blog_id, part)] = {
+                "id": post["id"],
+                "title": title,
+                "url": post.get("url"),
+                "content_hash": digest,
+                "published_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            }
+            self._save()
+
+    def remove(self, blog_id, part):
+        with self._lock:
+            if self.posts.pop(self._key(blog_id, part), None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.posts, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+def part_number(title, base_title):
+    """
+    Returns k for the post titled part_title(base_title, k, n) for any n,
+    or None when the title belongs to another post.
+    """
+    if title == base_title:
+        return 1
+    match = re.fullmatch(re.escape(base_title) + r" \(Part (\d+) of \d+\)", title or "")
+    return int(match.group(1)) if match else None
+
+def todays_posts(service, base_title, blog_id=BLOG_ID):
+    """
+    Live posts published since local midnight under base_title, as
+    {part: post}, for when the local index has no record of them (e.g.
+    another runner published them).
+    """
+    from datetime import datetime
+    midnight = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    with metrics.timer("blogger_api_seconds", call="posts.list"):
+        response = service.posts().list(
+            blogId=blog_id, startDate=midnight.isoformat(), fetchBodies=False,
+            status="LIVE", maxResults=50, fields="items(id,title,url)"
+        ).execute()
+    posts = {}
+    for post in response.get("items", []):
+        part = part_number(post.get("title"), base_title)
+        if part is not None:
+            posts.setdefault(part, post)
+    return posts
+
+def upsert_post(service, title, html_content, labels=DEFAULT_LABELS, index=None, blog_id=BLOG_ID,
+                part=1, base_title=None):
+    """
+    Publishes today's post (part `part` of a post titled base_title, which
+    defaults to title) at most once: skips the API entirely when the same
+    title and content were already published, patches the existing post
+    when either changed, and inserts otherwise.
+    Returns (action, post) with action one of "skipped", "patched", "inserted".
+    """
+    from googleapiclient.errors import HttpError
+    index = index or PublishedIndex()
+    digest = content_hash(html_content)
+    known = index.get(blog_id, part)
+    if known and known.get("content_hash") == digest and known.get("title") == title:
+        print(f'✅ Post unchanged, nothing to publish: {known.get("url")}')
+        metrics.incr("blogger_publish_total", action="skip")
+        return "skipped", known
+
+    existing = known or todays_posts(service, base_title or title, blog_id).get(part)
+    action = "patched"
+    post = None
+    if existing:
+        body = {"title": title, "content": html_content}
+        if labels:
+            body["labels"] = labels
+        try:
+            with metrics.timer("blogger_api_seconds", call="posts.patch"):
+                post = service.posts().patch(blogId=blog_id, postId=existing["id"], body=body).execute()
+            print(f'✅ Post updated: {post["url"]}')
+            metrics.incr("blogger_publish_total", action="patch")
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            print("[WARNING] Indexed post no longer exists. Publishing a new one.")
+    if post is None:
+        post = post_to_blogger(service, title, html_content, labels, blog_id)
+        metrics.incr("blogger_publish_total", action="insert")
+        action = "inserted"
+    index.record(blog_id, part, title, post, digest)
+    return action, post
+
+def remove_stale_parts(service, base_title, total, index, blog_id=BLOG_ID, check_blog=False):
+    """
+    Deletes today's parts numbered above total, left over from a run that
+    split the post into more parts. The index lists them; with check_blog
+    the blog is asked too, for parts another runner published. Returns
+    the deleted parts' numbers.
+    """
+    from googleapiclient.errors import HttpError
+    posts = index.parts(blog_id)
+    if check_blog:
+        posts = {**todays_posts(service, base_title, blog_id), **posts}
+    removed = []
+    for part in sorted(part for part in posts if part > total):
+        try:
+            with metrics.timer("blogger_api_seconds", call="posts.delete"):
+                service.posts().delete(blogId=blog_id, postId=posts[part]["id"]).execute()
+            print(f"🗑️ Removed part {part}, no longer part of today's post.")
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+        index.remove(blog_id, part)
+        removed.append(part)
+    return removed
+
+class BlogTarget(NamedTuple):
+    blog_id: str
+    title: str = TITLE_TEMPLATE
+    labels: Tuple[str, ...] = tuple(DEFAULT_LABELS)
+    timeout: float = BLOGGER_TIMEOUT
+
+def load_blog_targets(path=BLOG_TARGETS_FILE):
+    """
+    Reads the blogs to publish to from a JSON list such as
+    [{"blog_id": "123", "title": "Free Kindle Books {date}", "labels": ["Kindle"], "timeout": 30}].
+    Only blog_id is required. Without the file the post goes to BLOG_ID only.
+    """
+    if not os.path.exists(path):
+        return [BlogTarget(BLOG_ID)]
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return [BlogTarget(
+        blog_id=str(entry["blog_id"]),
+        title=entry.get("title", TITLE_TEMPLATE),
+        labels=tuple(entry.get("labels", DEFAULT_LABELS)),
+        timeout=float(entry.get("timeout", BLOGGER_TIMEOUT)),
+    ) for entry in entries]
+
+def part_title(title, part, total):
+    # A post that fits in one part keeps the plain title
+    return title if total == 1 else f"{title} (Part {part} of {total})"
+
+def _patch_content(service, blog_id, post_id, html_content):
+    with metrics.timer("blogger_api_seconds", call="posts.patch"):
+        return service.posts().patch(blogId=blog_id, postId=post_id, body={"content": html_content}).execute()
+
+def _publish_parts(target, render_part, total, mode, index):
+    """
+    Publishes one blog's parts in order and returns one result per part.
+    render_part(k, urls) renders part k given the part URLs known so far
+    (None for parts not yet published). Once every part is live, earlier
+    parts are updated so their navigation links to the later ones too.
+    """
+    title = get_post_title(target.title)
+    titles = [part_title(title, k + 1, total) for k in range(total)]
+    urls = [None] * total
+    posts = [None] * total
+    earlier = {}
+    if mode != "insert":
+        # Reruns start from the URLs already published today, so unchanged parts are skipped
+        earlier = index.parts(target.blog_id)
+        for k in range(total):
+            known = earlier.get(k + 1)
+            urls[k] = known.get("url") if known else None
+
+    results = []
+    for k in range(total):
+        started = time.perf_counter()
+        result = {"blog_id": target.blog_id, "title": titles[k], "action": None, "url": None, "error": None}
+        if results and results[-1]["action"] in ("failed", "not published"):
+            result.update(action="not published", error=f"part {k} failed")
+        else:
+            try:
+                service = get_thread_service(target.timeout)
+                html_content = render_part(k, urls)
+                if mode == "insert":
+                    action, post = "inserted", post_to_blogger(service, titles[k], html_content, target.labels, target.blog_id)
+                else:
+                    action, post = upsert_post(service, titles[k], html_content, target.labels, index,
+                                               target.blog_id, k + 1, title)
+                posts[k] = post
+                urls[k] = post.get("url")
+                result.update(action=action, url=urls[k])
+            except Exception as e:
+                result.update(action="failed", error=str(e))
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        results.append(result)
+
+    if total > 1 and all(post is not None for post in posts):
+        for k in range(total - 1):
+            started = time.perf_counter()
+            try:
+                service = get_thread_service(target.timeout)
+                html_content = render_part(k, urls)
+                if mode == "insert":
+                    _patch_content(service, target.blog_id, posts[k]["id"], html_content)
+                else:
+                    upsert_post(service, titles[k], html_content, target.labels, index, target.blog_id, k + 1, title)
+            except Exception as e:
+                results[k].update(action="failed", error=f"could not link later parts: {e}")
+            results[k]["seconds"] = round(results[k]["seconds"] + time.perf_counter() - started, 3)
+
+    if mode != "insert" and all(post is not None for post in posts):
+        # A rerun may split the post into fewer parts; the extra ones would be left dangling
+        started = time.perf_counter()
+        result = {"blog_id": target.blog_id, "title": f"{title} (parts after {total})",
+                  "action": None, "url": None, "error": None}
+        try:
+            removed = remove_stale_parts(get_thread_service(target.timeout), title, total, index,
+                                         target.blog_id, check_blog=not earlier)
+            if removed:
+                result.update(action="removed", error=f"parts {', '.join(map(str, removed))}")
+        except Exception as e:
+            result.update(action="failed", error=f"could not remove stale parts: {e}")
+        if result["action"]:
+            result["seconds"] = round(time.perf_counter() - started, 3)
+            results.append(result)
+    return results
+
+def _batch_insert(targets, html_content):
+    # One HTTP round-trip for every blog; only plain inserts can be batched
+    service = authenticate()
+    results = {}
+    started = time.perf_counter()
+
+    def on_response(request_id, post, error):
+        target = targets[int(request_id)]
+        result = {"blog_id": target.blog_id, "title": get_post_title(target.title)}
+        if error:
+            result.update(action="failed", url=None, error=str(error))
+        else:
+            result.update(action="inserted", url=post.get("url"), error=None)
+        results[int(request_id)] = result
+
+    batch = service.new_batch_http_request(callback=on_response)
+    for i, target in enumerate(targets):
+        body = post_body(get_post_title(target.title), html_content, target.labels, target.blog_id)
+        batch.add(service.posts().insert(blogId=target.blog_id, body=body), request_id=str(i))
+    with metrics.timer("blogger_api_seconds", call="batch.insert"):
+        batch.execute()
+    elapsed = round(time.perf_counter() - started, 3)
+    return [dict(results[i], seconds=elapsed) for i in range(len(targets))]
+
+class _PublishJob:
+    """
+    One blog's publish, run by a publish worker. started_at is set when a
+    worker picks it up, so time spent queued does not count against it.
+    """
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.started = threading.Event()
+        self.started_at = None
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        self.started_at = time.monotonic()
+        self.started.set()
+        try:
+            self.future.set_result(self.fn(*self.args))
+        except BaseException as e:
+            self.future.set_exception(e)
+
+def _publish_worker():
+    while True:
+        _publish_queue.get().run()
+
+def _submit_publish(workers, fn, *args):
+    with _publish_workers_lock:
+        while len(_publish_workers) < workers:
+            worker = threading.Thread(target=_publish_worker, daemon=True,
+                                      name=f"publish-{len(_publish_workers)}")
+            worker.start()
+            _publish_workers.append(worker)
+    job = _PublishJob(fn, *args)
+    _publish_queue.put(job)
+    return job
+
+def publish_parts(render_part, total, targets=None, mode=PUBLISH_MODE, max_workers=PUBLISH_CONCURRENCY):
+    """
+    Publishes a post split into `total` parts to every target blog at once.
+    Each blog gets its parts in order, titled "(Part k of n)", with
+    render_part(k, urls) rendering part k and its links to the others.
+    Returns one result per blog and part (action, url, error, seconds).
+    Parts left over from an earlier run that made more parts are deleted.
+    A blog with no answer within its timeout (per part, counted from when
+    a worker starts on it) is reported as "unknown", since its publish may
+    still go through, and does not hold up the others.
+    """
+    targets = targets or load_blog_targets()
+    authenticate()
+    index = PublishedIndex()
+    workers = max(1, min(max_workers, len(targets)))
+    jobs = [_submit_publish(workers, _publish_parts, target, render_part, total, mode, index)
+            for target in targets]
+    results = []
+    for target, job in zip(targets, jobs):
+        # Parts after the first are published twice at most: once, then to link later parts
+        deadline = target.timeout * (1 if total == 1 else 2 * total)
+        # A queued job waits for a free worker; socket timeouts bound how long that takes
+        job.started.wait()
+        remaining = max(0.0, deadline - (time.monotonic() - job.started_at))
+        try:
+            results.extend(job.future.result(timeout=remaining))
+        except FutureTimeout:
+            results.append({"blog_id": target.blog_id, "title": get_post_title(target.title),
+                            "action": "unknown", "url": None,
+                            "error": f"no response within {deadline:g}s, the post may still go live",
+                            "seconds": deadline})
+    return _report(results)
+
+def publish_to_blogs(html_content, targets=None, mode=PUBLISH_MODE,
+                     max_workers=PUBLISH_CONCURRENCY, batch=BATCH_INSERTS):
+    """
+    Publishes the same rendered HTML to every target blog at once, each with
+    its own title, labels and timeout, and returns one result per blog
+    (action, url, error, seconds). A blog that misses its timeout is
+    reported as "unknown"; the others are not held up by it.
+    """
+    targets = targets or load_blog_targets()
+    if batch and mode == "insert" and len(targets) > 1:
+        authenticate()
+        return _report(_batch_insert(targets, html_content))
+    return publish_parts(lambda k, urls: html_content, 1, targets, mode, max_workers)
+
+def _report(results):
+    print("📋 Publish report:")
+    for result in results:
+        detail = result["url"] or result["error"] or ""
+        print(f"   {result['blog_id']} {result['title']}: {result['action']} in {result['seconds']}s {detail}")
+        metrics.event("publish", **result)
+    return results
+
+def main():
+    # Read your daily generated HTML file
+    html_file = 'output.html'
+    if not os.path.exists(html_file):
+        print(f"❌ HTML file '{html_file}' not found.")
+        return
+
+    # Publish the parts Blog_generator split the post into, the same way the pipeline does
+    import Blog_generator
+    parts_file = Blog_generator.PARTS_FILE
+    if os.path.exists(parts_file) and os.path.getmtime(parts_file) >= os.path.getmtime(html_file):
+        parts = Blog_generator.load_parts(parts_file)
+        results = publish_parts(lambda k, urls: Blog_generator.render_part(parts, k, urls), len(parts))
+    else:
+        with open(html_file, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+        results = publish_to_blogs(html_content)
+
+    failed = [r["blog_id"] for r in results if r["action"] == "failed"]
+    if failed:
+        raise SystemExit(f"❌ Publishing failed for blog(s): {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
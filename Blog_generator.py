@@ -1,8 +1,26 @@
+import io
+import os
+import json
+import re
 import time
 import random
+import threading
+from datetime import date, timedelta
+from html import escape
+from typing import List, NamedTuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from http_session import TIMEOUT, get_session
+from page_cache import get_cache
+from metrics import metrics
+from profiling import profiled
+from retry_policy import CircuitBreaker, RetryError, RetryPolicy, parse_retry_after
+from search_parser import AMAZON_HOST, looks_like_search_page, timed_parse
+from seen_books import SeenBookIndex, extract_asin
+from book import Book
+from book_store import BookStore
 
 # Base URL of the Amazon Kindle books page
 base_url = "https://www.amazon.in/s?i=digital-text&bbn=10837929031&rh=n%3A10837929031%2Cp_36%3A-100&s=date-desc-rank&language=en_IN&linkCode=ll2&linkId=f7edd02bf11a81392e4cb3e1a90ece8a&tag=receiver06-21&ref=as_li_ss_tl"
@@ -17,427 +35,604 @@ headers_list = [
 # Select a random header from the list
 headers = random.choice(headers_list)
 
-# List to store filtered book details
-all_books = []
+# Optional JSON list of search sources to scrape in one run, see load_sources
+SOURCES_FILE = os.getenv("KINDLE_SOURCES_FILE", "search_sources.json")
 
-# Function to fetch books from a single page
-def fetch_books_from_page(url, delay=2, retries=3):
-    """
-    Fetches books from a given page URL and extracts relevant information.
-    Retries in case of failure.
-    """
-    print(f"[DEBUG] Fetching URL: {url}")
-    
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                print(f"[DEBUG] Page fetched successfully. Status Code: {response.status_code}")
-                return BeautifulSoup(response.content, "html.parser")
-            else:
-                print(f"[WARNING] HTTP {response.status_code} - Retry {attempt + 1}/{retries}")
-                time.sleep(delay)
-        except Exception as e:
-            print(f"[ERROR] An error occurred: {e}")
-            time.sleep(delay)
-    
-    print("[ERROR] Failed to fetch the page after retries.")
-    return None
+# Number of result pages fetched in parallel once page 1 gives the page count (1 = serial)
+FETCH_CONCURRENCY = int(os.getenv("KINDLE_FETCH_CONCURRENCY", "4"))
 
-# Function to extract the last page number from pagination
-def get_last_page_number(soup):
-    print("[DEBUG] Extracting last page number...")
-    pagination = soup.find("span", {"class": "s-pagination-strip"})
-    if pagination:
-        page_numbers = pagination.find_all("span", {"class": "s-pagination-item"})
-        last_page = 1  # Default if we can't find the last page
-        for page in page_numbers:
-            try:
-                page_number = int(page.text.strip())
-                last_page = max(last_page, page_number)
-            except ValueError:
-                continue  # Ignore non-numeric entries like "Next" or "..."
-        print(f"[DEBUG] Last page number identified: {last_page}")
-        return last_page
-    print("[DEBUG] No pagination found. Assuming single page.")
-    return 1  # Return 1 if no pagination found
-
-# Function to handle pagination and fetch books from all pages
-def fetch_books():
-    run_once = True
-    page_number = 1
-    last_page = 1  # Default to 1 in case of errors
+# Processes parsing downloaded pages while the fetch threads keep downloading (0 = parse in the fetch thread)
+PARSE_WORKERS = int(os.getenv("KINDLE_PARSE_WORKERS", "0"))
 
-    while True:
-        print(f"[INFO] Fetching page {page_number}...")
-        url = f"{base_url}&page={page_number}"
-        
-        soup = fetch_books_from_page(url)
-        if not soup:
-            print("[ERROR] Failed to fetch the page. Exiting...")
-            break  # Exit if the page cannot be fetched
-        
-        # Extract last page number
-        if run_once:
-            last_page = get_last_page_number(soup)
-            run_once = False
-        
-        # Extract book details from the current page
-        book_containers = soup.find_all("div", {"data-component-type": "s-search-result"})
-        print(f"[DEBUG] Found {len(book_containers)} book containers on the page.")
-
-        for container in book_containers:
-            # Check if the book has the "Or ₹0 to buy" offer
-            offer_tag = container.find("div", {"data-cy": "secondary-offer-recipe"})
-            if offer_tag and "Or ₹0 to buy" in offer_tag.text:
-                # Extract title
-                title_tag = container.find("h2", {"class": "a-size-medium"})
-                title = title_tag.text.strip() if title_tag else None
-
-                # Extract price
-                price_tag = container.find("span", {"class": "a-price-whole"})
-                price = price_tag.text.strip() if price_tag else "Free"
-
-                # Extract link
-                link_tag = container.find("a", {"class": "a-link-normal"}, href=True)
-                link = f"https://www.amazon.in{link_tag['href']}" if link_tag else None
-
-                # Extract image URL
-                image_tag = container.find("img", {"class": "s-image"})
-                image_url = image_tag['src'] if image_tag else None
-
-                if title:
-                    all_books.append({
-                        "Title": title,
-                        "Price": price,
-                        "Link": link + "&tag=receiver06-21",
-                        "Image URL": image_url
-                    })
+# Downloaded pages allowed to wait for or sit in the parse pool before fetchers block
+PARSE_QUEUE_SIZE = int(os.getenv("KINDLE_PARSE_QUEUE_SIZE", "8"))
 
-        if page_number >= last_page:
-            print("[INFO] Reached the last page.")
-            break  # No more pages, exit the loop
-        
-        # Check for "Next" page link
-        next_page_tag = soup.find("li", {"class": "s-pagination-item s-pagination-next"})
-        if next_page_tag and 's-pagination-disabled' in next_page_tag.get("class", []):
-            print("[INFO] Next button is disabled. Exiting...")
-            break  # No next page, exit the loop
-        else:
-            page_number += 1  # Go to the next page
+# Minimum gap in seconds between two requests to the same host
+MIN_REQUEST_INTERVAL = float(os.getenv("KINDLE_MIN_REQUEST_INTERVAL", "1.0"))
 
-# Run the fetching process
-fetch_books()
+# Stop paginating at the first page made up entirely of books seen on earlier days
+INCREMENTAL = os.getenv("KINDLE_INCREMENTAL", "0") == "1"
 
-# Save the books to Excel if any are found
-if all_books:
-    print(f"[INFO] Total books found: {len(all_books)}")
-    df = pd.DataFrame(all_books)
-    df.to_excel("kindle_books_filtered_all_pages.xlsx", index=False)
-    print("[INFO] Data successfully saved to kindle_books_filtered_all_pages.xlsx")
-else:
-    print("[WARNING] No books matching the filter found.")
-# Check if any books were found and save to Excel
-if all_books:
-    df = pd.DataFrame(all_books)
-    df.to_excel("kindle_books_filtered_all_pages.xlsx", index=False)
-    print("Data successfully saved to kindle_books_filtered_all_pages.xlsx")
-else:
-    print("No books matching the filter found.")
+# Publish whatever was collected when a page still fails after all retries
+ALLOW_PARTIAL = os.getenv("KINDLE_ALLOW_PARTIAL", "0") == "1"
 
+# Split the post into "New today" / "Still free since ..." sections from the book store
+HISTORY_SECTIONS = os.getenv("KINDLE_HISTORY_SECTIONS", "0") == "1"
 
-def generate_html_from_excel(excel_file, output_html_file):
-    # Read the Excel file
-    try:
-        df = pd.read_excel(excel_file)
-    except FileNotFoundError:
-        print(f"Error: The file {excel_file} was not found.")
-        return
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return
+# "fragment" renders only the post body; "document" a full HTML page with its own <style>
+RENDER_MODE = os.getenv("KINDLE_RENDER_MODE", "fragment")
 
-    # Tamil paragraph content
-    paragraph_top = """
-    <p class="paragraph">
-    
-        <strong>அன்பார்ந்த புத்தக வாசகர்களே!</strong><br><br>
-        <strong>அமேசான் <span style='color:orange'>கிண்டிலில்</span></strong> நாள்தோறும் புத்தகங்கள் இலவசமாக வழங்கப்படுகிறது.<br>
-        இந்த இலவச புத்தகமானது அந்தந்த ஆசிரியர்களே இலவசமாக வழங்குகின்றனர்.<br><br>
-        இந்த இலவச புத்தகங்கள் இந்திய நேரப்படி அறிவித்த நாளில் மதியம் <strong>1:30pm</strong> முதல் 
-        மறுநாள் மதியம் <strong>1:30pm</strong> வரை செல்லுபடியாகும்.<br>
-        <strong style='color: red'>(சில புத்தகங்கள் தொடர்ச்சியாக இலவசமாக கிடைக்கும்)</strong><br>
-        அந்த புத்தகங்களை பெற முந்தைய நாள் பதிவுகளையும் காணுங்கள் நன்றி.
-<strong>அமேசான் <span style='color:orange'>கிண்டிலில்</span></strong> இருந்து இலவசமாக புத்தகத்தை வாங்குவது எப்படி என்று தெரிந்து கொள்ள 
-       <strong> <a href="https://receiverindia.blogspot.com/2020/05/how-to-buy-free-books-in-amazon-kindle_7.html">இங்கே கிளிக் செய்யவும்.</strong></a><br><br>
+# Where fragments get their styles: the URL of a hosted kindle_books.css, "theme" when it
+# is pasted into the blog theme, or empty to inline a copy scoped to the post
+STYLESHEET_URL = os.getenv("KINDLE_STYLESHEET_URL", "")
 
-    </p>
-    """
-    paragraph_bottom = """
-    <p class="paragraph">
-        <strong>அமேசான் <span style='color:orange'>கிண்டிலில்</span></strong> இருந்து இலவசமாக புத்தகத்தை வாங்குவது எப்படி என்று தெரிந்து கொள்ள 
-        <a href="https://receiverindia.blogspot.com/2020/05/how-to-buy-free-books-in-amazon-kindle_7.html">இங்கே கிளிக் செய்யவும்.</a><br><br>
-        For our regular updates follow us on social media platforms.<br><br>
-        <strong><a href="https://fb.com/receiverindia">Facebook</a> <a href="https://x.com/receiverindia">X</a> <a href="https://instagram.com/receiverindia">Instagram</a> <a href="https://www.youtube.com/@receiverindia">Youtube</a> </strong><br>
-        உங்கள் புத்தகத்தை பல வாசகர்களிடம் கொண்டு சேர்க்க இங்கே பதிவிடுங்கள்.<br><br>
-        நீங்கள் உங்கள் புத்தகத்தின் லிங்க் மற்றும் இலவச விற்பனைக்கு கொடுத்துள்ள தேதியையும் 
-        எங்கள் முகநூல் பக்கத்திற்கு அனுப்புங்கள்.<br>
-நன்றி மீண்டும் வருக!!!<br>
+# Collapse the templates' indentation and line breaks in the rendered HTML
+MINIFY = os.getenv("KINDLE_MINIFY", "1") == "1"
 
+# Split the post into parts of at most this many books / bytes of book cards (0 = no limit)
+SHARD_MAX_BOOKS = int(os.getenv("KINDLE_SHARD_MAX_BOOKS", "200"))
+SHARD_MAX_BYTES = int(os.getenv("KINDLE_SHARD_MAX_BYTES", str(500 * 1024)))
 
-    </p>
-    """
+# The parts of the last rendered post, for publishing them from a separate step
+PARTS_FILE = os.getenv("KINDLE_PARTS_FILE", "output_parts.json")
 
-    # Start the HTML content with a style block for better maintainability
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="ta">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">      
-        <title>Kindle Books</title>
-        <style>
-            body {
-                font-family: Arial, sans-serif;
-                margin: 20px;
-            }
-            .paragraph {
-                text-align: center;
-                font-size: 18px;
-                line-height: 1.8;
-                margin-bottom: 40px;
-            }
-            .book-container {
-                display: flex;
-                flex-wrap: wrap;
-                justify-content: center;
-                gap: 20px;
-            }
-            .book-item {
-                text-align: center;
-                width: 200px;
-            }
-            .book-item img {
-                width: 150px;
-                height: auto;
-            }
-            .book-item a {
-                display: block;
-                margin-top: 10px;
-                font-size: 16px;
-                color: #0066cc;
-                text-decoration: none;
-            }
-            .book-item a:hover {
-                text-decoration: underline;
-            }
-        </style>
-    </head>
-    <body>
-    """
+# Cover size in the post, in CSS pixels; Kindle covers are roughly 2:3
+COVER_WIDTH = 150
+COVER_HEIGHT = 225
 
-    # Add the top paragraph
-    html_content += paragraph_top
+# Affiliate tag carried by every published book link
+AFFILIATE_TAG = "receiver06-21"
 
-    # Start the book container
-    html_content += '<div class="book-container">\n'
+# Add a "Still Free" column for books that were already free on earlier days
+MARK_STILL_FREE = os.getenv("KINDLE_MARK_STILL_FREE", "0") == "1"
 
-    # Generate a div for each row in the dataframe
-    for _, row in df.iterrows():
-        title = row['Title']
-        link = row['Link']
-        image_url = row['Image URL']
-        
-        html_content += f'''
-        <div class="book-item">
-            <img src="{image_url}" alt="{title}">
-            <a href="{link}" target="_blank">{title}</a>
-        </div>
-        '''
-
-    # Close the book container
-    html_content += '</div>\n'
-
-    # Add the bottom paragraph
-    html_content += paragraph_bottom
-
-    # Close the HTML tags
-    html_content += """
-    </body>
-    </html>
+class HostThrottle:
     """
-
-    # Write the content to the output HTML file
-    with open(output_html_file, 'w', encoding='utf-8') as file:
-        file.write(html_content)
-
-    print(f"HTML file generated: {output_html_file}")
-
-# Usage example
-excel_file = 'kindle_books_filtered_all_pages.xlsx'  # Replace with your Excel file name
-output_html_file = 'output.html'  # Replace with your desired output HTML file name
-generate_html_from_excel(excel_file, output_html_file)
-import time
-import random
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-
-# Base URL of the Amazon Kindle books page
-base_url = "https://www.amazon.in/s?i=digital-text&bbn=10837929031&rh=n%3A10837929031%2Cp_36%3A-100&s=date-desc-rank&linkCode=ll2&tag=receiver06-21&linkId=f7edd02bf11a81392e4cb3e1a90ece8a&language=en_IN&ref_=as_li_ss_tl"
-
-# List of possible headers to avoid detection
-headers_list = [
-    {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"},
-    {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/104.0.0.0 Safari/537.36"},
-    {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/106.0.1370.47 Safari/537.36"}
-]
-
-# Select a random header from the list
-headers = random.choice(headers_list)
-
-# List to store filtered book details
-all_books = []
-
-# Function to fetch books from a single page
-def fetch_books_from_page(url, delay=2, retries=3):
+    Limits how many requests run against one host at a time and
+    spaces request starts to that host by at least min_interval seconds.
     """
-    Fetches books from a given page URL and extracts relevant information.
-    Retries in case of failure.
+    def __init__(self, max_concurrency=FETCH_CONCURRENCY, min_interval=MIN_REQUEST_INTERVAL):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _state(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                # [semaphore, monotonic time of the next free start slot]
+                self._hosts[host] = [threading.BoundedSemaphore(self.max_concurrency), 0.0]
+            return self._hosts[host]
+
+    @contextmanager
+    def slot(self, url):
+        state = self._state(urlparse(url).netloc)
+        with state[0]:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, state[1])
+                state[1] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+# Function to download the raw bytes of a single page
+def download_page(url, policy=None, throttle=None, session=None, cache=None, breaker=None):
     """
+    Returns the raw bytes of a page, from the on-disk page cache when
+    possible. Requests go through the shared keep-alive session with
+    explicit connect/read timeouts. When a throttle is given, every attempt
+    waits for a free per-host slot first. In replay mode the network is
+    never touched.
+
+    Failures are retried with jittered exponential backoff (honouring
+    Retry-After) from separate connect, read and HTTP-status budgets.
+    Returns None once a budget is used up; raises CircuitOpenError when the
+    breaker decides the upstream is down.
+    """
+    cache = cache or get_cache()
+    content = cache.get(url)
+    if content is not None:
+        print(f"[DEBUG] Cache hit: {url}")
+        metrics.incr("page_cache_hits_total")
+        return content
+    if cache.replay:
+        print(f"[ERROR] Replay mode and no cached copy of {url}")
+        return None
+
     print(f"[DEBUG] Fetching URL: {url}")
-    
-    for attempt in range(retries):
+    session = session or get_session(FETCH_CONCURRENCY, headers)
+    attempts = (policy or RetryPolicy()).new_attempts()
+
+    while True:
+        if breaker:
+            breaker.before_request()
+        retry_after = None
+        started = time.perf_counter()
         try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                print(f"[DEBUG] Page fetched successfully. Status Code: {response.status_code}")
-                return BeautifulSoup(response.content, "html.parser")
+            if throttle:
+                with throttle.slot(url):
+                    response = session.get(url, timeout=TIMEOUT)
             else:
-                print(f"[WARNING] HTTP {response.status_code} - Retry {attempt + 1}/{retries}")
-                time.sleep(delay)
-        except Exception as e:
+                response = session.get(url, timeout=TIMEOUT)
+            elapsed = time.perf_counter() - started
+            record_request(url, response.status_code, elapsed, attempts.attempt, len(response.content))
+            if response.status_code == 200:
+                print(f"[DEBUG] Page fetched successfully. Status Code: {response.status_code} in {elapsed * 1000:.0f} ms")
+                if breaker:
+                    breaker.record_success()
+                # Robot checks come back as 200 too; caching one would empty every rerun's post
+                if looks_like_search_page(response.content):
+                    try:
+                        cache.put(url, response.content)
+                    except OSError as e:
+                        print(f"[WARNING] Could not cache {url}: {e}")
+                else:
+                    print(f"[WARNING] No search results in {url}, not caching it.")
+                return response.content
+            if response.status_code not in attempts.policy.retry_statuses:
+                print(f"[ERROR] HTTP {response.status_code} is not retryable.")
+                break
+            kind = "status"
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            print(f"[WARNING] HTTP {response.status_code} - Retry {attempts.attempt + 1}")
+        except requests.exceptions.ConnectionError as e:
+            # Includes ConnectTimeout: the request never reached the server
+            kind = "connect"
+            record_request(url, type(e).__name__, time.perf_counter() - started, attempts.attempt, 0)
+            print(f"[ERROR] Connect error: {e}")
+        except (requests.exceptions.ReadTimeout, requests.exceptions.ChunkedEncodingError) as e:
+            kind = "read"
+            record_request(url, type(e).__name__, time.perf_counter() - started, attempts.attempt, 0)
+            print(f"[ERROR] Read error: {e}")
+        except requests.exceptions.RequestException as e:
+            record_request(url, type(e).__name__, time.perf_counter() - started, attempts.attempt, 0)
             print(f"[ERROR] An error occurred: {e}")
-            time.sleep(delay)
+            break
+
+        if breaker:
+            breaker.record_failure()
+        metrics.incr("http_retry_budget_spent_total", kind=kind)
+        try:
+            delay = attempts.next_delay(kind, retry_after)
+        except RetryError as e:
+            print(f"[ERROR] Giving up on {url}: {e}")
+            break
+        time.sleep(delay)
     
     print("[ERROR] Failed to fetch the page after retries.")
+    metrics.incr("http_pages_failed_total")
     return None
 
-# Function to extract the last page number from pagination
-def get_last_page_number(soup):
-    print("[DEBUG] Extracting last page number...")
-    pagination = soup.find("span", {"class": "s-pagination-strip"})
-    if pagination:
-        page_numbers = pagination.find_all("span", {"class": "s-pagination-item"})
-        last_page = 1  # Default if we can't find the last page
-        for page in page_numbers:
-            try:
-                page_number = int(page.text.strip())
-                last_page = max(last_page, page_number)
-            except ValueError:
-                continue  # Ignore non-numeric entries like "Next" or "..."
-        print(f"[DEBUG] Last page number identified: {last_page}")
-        return last_page
-    print("[DEBUG] No pagination found. Assuming single page.")
-    return 1  # Return 1 if no pagination found
-
-# Function to handle pagination and fetch books from all pages
-def fetch_books():
-    run_once = True
-    page_number = 1
-    last_page = 1  # Default to 1 in case of errors
+# Function to report one HTTP attempt to the run metrics
+def record_request(url, status, elapsed, attempt, size):
+    metrics.incr("http_requests_total", status=status)
+    metrics.observe("http_request_seconds", elapsed)
+    metrics.incr("http_bytes_downloaded_total", size)
+    if attempt:
+        metrics.incr("http_retries_total")
+    metrics.event("http_request", url=url, status=status, latency_ms=round(elapsed * 1000, 1),
+                  attempt=attempt + 1, bytes=size)
 
-    while True:
-        print(f"[INFO] Fetching page {page_number}...")
-        url = f"{base_url}&page={page_number}"
-        
-        soup = fetch_books_from_page(url)
-        if not soup:
-            print("[ERROR] Failed to fetch the page. Exiting...")
-            break  # Exit if the page cannot be fetched
-        
-        # Extract last page number
-        if run_once:
-            last_page = get_last_page_number(soup)
-            run_once = False
-        
-        # Extract book details from the current page
-        book_containers = soup.find_all("div", {"data-component-type": "s-search-result"})
-        print(f"[DEBUG] Found {len(book_containers)} book containers on the page.")
-
-        for container in book_containers:
-            # Check if the book has the "Or ₹0 to buy" offer
-            offer_tag = container.find("div", {"data-cy": "secondary-offer-recipe"})
-            if offer_tag and "Or ₹0 to buy" in offer_tag.text:
-                # Extract title
-                title_tag = container.find("h2", {"class": "a-size-medium"})
-                title = title_tag.text.strip() if title_tag else None
-
-                # Extract price
-                price_tag = container.find("span", {"class": "a-price-whole"})
-                price = price_tag.text.strip() if price_tag else "Free"
-
-                # Extract link
-                link_tag = container.find("a", {"class": "a-link-normal"}, href=True)
-                link = f"https://www.amazon.in{link_tag['href']}" if link_tag else None
-
-                # Extract image URL
-                image_tag = container.find("img", {"class": "s-image"})
-                image_url = image_tag['src'] if image_tag else None
-
-                if title:
-                    all_books.append({
-                        "Title": title,
-                        "Price": price,
-                        "Link": link + "&tag=receiver06-21",
-                        "Image URL": image_url
-                    })
+# Function to fetch books from a single page
+@profiled("fetch_books_from_page")
+def fetch_books_from_page(url, policy=None, throttle=None, session=None, breaker=None):
+    """
+    Fetches a search page and parses its results and pagination state.
+    Returns None when the page could not be downloaded.
+    """
+    content = download_page(url, policy, throttle, session, breaker=breaker)
+    if content is None:
+        return None
+    page, elapsed = timed_parse(content)
+    record_parse(url, page, elapsed)
+    return page
+
+def record_parse(url, page, elapsed):
+    metrics.observe("parse_seconds", elapsed)
+    metrics.observe("page_containers", len(page.results))
+    metrics.event("page_parsed", url=url, parse_ms=round(elapsed * 1000, 2), containers=len(page.results))
+
+class ParsePool:
+    """
+    Parses downloaded pages in worker processes so CPU-bound parsing
+    overlaps with the network waits of the fetch threads. At most
+    queue_size pages are waiting for or in the pool at once; a fetcher that
+    finds it full blocks before downloading more, which bounds memory.
+    """
+    def __init__(self, workers=PARSE_WORKERS, queue_size=PARSE_QUEUE_SIZE):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn: forking a process that already runs fetch threads is not safe
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self.slots = threading.BoundedSemaphore(max(1, queue_size))
+
+    def submit(self, content):
+        self.slots.acquire()
+        try:
+            future = self.pool.submit(timed_parse, content)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
 
+def fetch_page_for_pool(url, parse_pool, policy=None, throttle=None, session=None, breaker=None):
+    """
+    Downloads a search page and hands its bytes to the parse pool.
+    Returns the parse future, or None when the page could not be downloaded.
+    """
+    content = download_page(url, policy, throttle, session, breaker=breaker)
+    if content is None:
+        return None
+    return parse_pool.submit(content)
+
+def canonical_link(link, asin=None):
+    """
+    Returns the short /dp/<ASIN>?tag=... form of a product link, dropping
+    the per-result ref/qid/sr parameters. Links without an ASIN keep their
+    path and just get the tag appended.
+    """
+    asin = asin or extract_asin(link)
+    if asin:
+        return f"{AMAZON_HOST}/dp/{asin}?tag={AFFILIATE_TAG}"
+    separator = "&" if "?" in link else "?"
+    return f"{link}{separator}tag={AFFILIATE_TAG}"
+
+# Function to keep the free books of one parsed result page
+def extract_books(page, seen_index=None, mark_still_free=False, seen_keys=None, source=None):
+    """
+    Returns the free books of a page as Books with canonical links. With a
+    seen_keys set, books already in it (by ASIN, or by link when there is
+    no ASIN) are skipped and the rest are added, so sponsored and organic
+    copies of a book, or one that moved across pages, appear only once.
+    """
+    print(f"[DEBUG] Found {len(page.results)} book containers on the page.")
+    books = []
+    for result in page.results:
+        # Keep only books with the "Or ₹0 to buy" offer
+        if result.is_free and result.title and result.link:
+            asin = extract_asin(result.link)
+            link = canonical_link(result.link, asin)
+            if seen_keys is not None:
+                key = asin or link
+                if key in seen_keys:
+                    metrics.incr("duplicate_books_total")
+                    continue
+                seen_keys.add(key)
+            still_free = None
+            if mark_still_free:
+                still_free = bool(seen_index is not None and asin and seen_index.is_still_free(asin))
+            books.append(Book(
+                asin=asin,
+                title=result.title,
+                price=result.price,
+                link=link,
+                image_url=result.image_url,
+                first_seen=seen_index.first_seen(asin) if seen_index is not None and asin else None,
+                still_free=still_free,
+                source=source,
+            ))
+    return books
+
+# Function to check whether every book on a page was already seen on an earlier day
+def is_page_known(page, seen_index):
+    asins = [extract_asin(result.link) for result in page.results]
+    return bool(asins) and all(asin and seen_index.is_known(asin) for asin in asins)
+
+# Function to remember every book of a page in the seen-book index
+def record_seen_books(page, seen_index):
+    # The book store records whole fetches at once, in record_books_in_store
+    if isinstance(seen_index, BookStore):
+        return
+    for result in page.results:
+        asin = extract_asin(result.link)
+        if asin:
+            seen_index.record(asin, result.is_free)
+
+# Function to write every book of the fetched pages to the book store in one transaction
+def record_books_in_store(pages, store):
+    entries = []
+    for page in pages:
+        for result in page.results:
+            asin = extract_asin(result.link)
+            if asin:
+                entries.append((asin, result.title, result.price, canonical_link(result.link, asin),
+                                result.image_url, result.is_free))
+    with metrics.timer("book_store_seconds"):
+        store.record(entries)
+    print(f"[DEBUG] Book store holds {len(store)} books.")
+
+# Function to handle pagination and fetch the result pages
+def fetch_pages(concurrency=FETCH_CONCURRENCY, min_interval=MIN_REQUEST_INTERVAL,
+                incremental=INCREMENTAL, seen_index=None, policy=None, allow_partial=ALLOW_PARTIAL,
+                parse_workers=PARSE_WORKERS, url=None, throttle=None, breaker=None, parse_pool=None,
+                name=None):
+    """
+    Fetches page 1 to learn the page count, then pages 2..N through a
+    bounded worker pool (serially when concurrency is 1). Pages are
+    returned parsed and in page order; the walk stops at the first page
+    that fails or whose "Next" button is disabled, as the serial walk did.
+    Parsing happens here because every stop decision depends on the page.
+
+    Every result is recorded in the seen-book index; a BookStore passed as
+    the index is written by record_books_in_store instead. In incremental mode
+    the walk also stops at the first page whose books were all seen on
+    earlier days, since results are sorted newest first.
+
+    A page that still fails after its retries raises RetryError, so a short
+    post is never published silently, unless allow_partial is set. A circuit
+    breaker shared by all pages raises CircuitOpenError once the upstream
+    looks down.
+
+    url defaults to base_url. fetch_sources passes its own url, name and
+    the throttle, breaker and parse pool it shares between sources.
+    """
+    url = url or base_url
+    label = f"{name} " if name else ""
+    throttle = throttle or HostThrottle(concurrency, min_interval)
+    session = get_session(concurrency, headers)
+    policy = policy or RetryPolicy()
+    breaker = breaker or CircuitBreaker()
+    if seen_index is None:
+        seen_index = SeenBookIndex()
+    pages = []
+    # Started before page 1 so the worker processes boot while it downloads
+    own_parse_pool = parse_pool is None and parse_workers > 0
+    if own_parse_pool:
+        parse_pool = ParsePool(parse_workers)
+
+    def page_url(page_number):
+        return f"{url}&page={page_number}"
+
+    def fetch_page(page_number):
+        print(f"[INFO] Fetching {label}page {page_number}...")
+        return fetch_books_from_page(page_url(page_number), policy, throttle, session, breaker)
+
+    def fetch_for_pool(page_number):
+        print(f"[INFO] Fetching {label}page {page_number}...")
+        return fetch_page_for_pool(page_url(page_number), parse_pool, policy, throttle, session, breaker)
+
+    def parsed(page_number, parse_future):
+        if parse_future is None:
+            return None
+        page, elapsed = parse_future.result()
+        record_parse(page_url(page_number), page, elapsed)
+        return page
+
+    def collect(page_number, page):
+        if not page:
+            if not allow_partial:
+                raise RetryError(f"Page {page_number} could not be fetched")
+            print("[ERROR] Failed to fetch the page. Exiting...")
+            return False  # Stop if the page cannot be fetched
+        known = incremental and is_page_known(page, seen_index)
+        record_seen_books(page, seen_index)
+        if known:
+            if isinstance(seen_index, BookStore):
+                # The stop page is not returned, so record its books here or their free streaks break
+                record_books_in_store([page], seen_index)
+            print(f"[INFO] Every book on page {page_number} was seen before. Stopping incremental scrape.")
+            return False
+        pages.append(page)
         if page_number >= last_page:
             print("[INFO] Reached the last page.")
-            break  # No more pages, exit the loop
-        
-        # Check for "Next" page link
-        next_page_tag = soup.find("li", {"class": "s-pagination-item s-pagination-next"})
-        if next_page_tag and 's-pagination-disabled' in next_page_tag.get("class", []):
+            return False
+        if page.next_disabled:
             print("[INFO] Next button is disabled. Exiting...")
-            break  # No next page, exit the loop
-        else:
-            page_number += 1  # Go to the next page
-
-# Run the fetching process
-fetch_books()
-
-# Save the books to Excel if any are found
-if all_books:
-    print(f"[INFO] Total books found: {len(all_books)}")
-    df = pd.DataFrame(all_books)
-    df.to_excel("kindle_books_filtered_all_pages.xlsx", index=False)
-    print("[INFO] Data successfully saved to kindle_books_filtered_all_pages.xlsx")
-else:
-    print("[WARNING] No books matching the filter found.")
-# Check if any books were found and save to Excel
-if all_books:
-    df = pd.DataFrame(all_books)
-    df.to_excel("kindle_books_filtered_all_pages.xlsx", index=False)
-    print("Data successfully saved to kindle_books_filtered_all_pages.xlsx")
-else:
-    print("No books matching the filter found.")
-
+            return False
+        return True
+
+    def walk():
+        nonlocal last_page
+        page = fetch_page(1)
+        if page:
+            last_page = page.last_page
+            print(f"[DEBUG] Last page number identified: {last_page}")
+        if not collect(1, page):
+            return
+
+        page_numbers = range(2, last_page + 1)
+        if parse_pool is not None:
+            print(f"[INFO] Fetching pages 2-{last_page} with {max(1, concurrency)} workers, "
+                  f"parsing in {parse_workers} processes...")
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                futures = [pool.submit(fetch_for_pool, page_number) for page_number in page_numbers]
+                try:
+                    # Merge in page order; later pages keep downloading and parsing meanwhile
+                    for page_number, future in zip(page_numbers, futures):
+                        if not collect(page_number, parsed(page_number, future.result())):
+                            break
+                finally:
+                    for future in futures:
+                        future.cancel()
+            return
+
+        if concurrency <= 1:
+            for page_number in page_numbers:
+                if not collect(page_number, fetch_page(page_number)):
+                    break
+            return
+
+        print(f"[INFO] Fetching pages 2-{last_page} with {concurrency} workers...")
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(fetch_page, page_number) for page_number in page_numbers]
+            try:
+                for page_number, future in zip(page_numbers, futures):
+                    if not collect(page_number, future.result()):
+                        break
+            finally:
+                for future in futures:
+                    future.cancel()  # Drop pages queued after a stop or failure
 
-def generate_html_from_excel(excel_file, output_html_file):
-    # Read the Excel file
+    last_page = 1  # Default to 1 in case of errors
     try:
-        df = pd.read_excel(excel_file)
-    except FileNotFoundError:
-        print(f"Error: The file {excel_file} was not found.")
-        return
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return
+        walk()
+    finally:
+        if own_parse_pool:
+            parse_pool.close()
+        if not isinstance(seen_index, BookStore):
+            seen_index.save()
+            print(f"[DEBUG] Seen-book index holds {len(seen_index)} books.")
+    return pages
+
+# Function to keep the free books of all fetched pages
+def filter_books(pages, seen_index=None, mark_still_free=MARK_STILL_FREE, seen_keys=None,
+                 source=None) -> List[Book]:
+    books = []
+    seen_keys = set() if seen_keys is None else seen_keys
+    for page in pages:
+        books.extend(extract_books(page, seen_index, mark_still_free, seen_keys, source))
+    return books
+
+class SearchSource(NamedTuple):
+    name: str
+    url: str
+    label: str = ""
+
+def load_sources(path=SOURCES_FILE):
+    """
+    Reads the searches to scrape from a JSON list such as
+    [{"name": "tamil-new", "url": "https://www.amazon.in/s?...", "label": "Tamil, newest first"}].
+    Without the file, base_url is the only source.
+    """
+    if not os.path.exists(path):
+        return [SearchSource("kindle", base_url)]
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return [SearchSource(entry["name"], entry["url"], entry.get("label", entry["name"])) for entry in entries]
+
+def fetch_sources(sources=None, concurrency=FETCH_CONCURRENCY, min_interval=MIN_REQUEST_INTERVAL,
+                  incremental=INCREMENTAL, seen_index=None, policy=None, allow_partial=ALLOW_PARTIAL,
+                  parse_workers=PARSE_WORKERS):
+    """
+    Walks every source's result pages at once and returns (source, pages)
+    pairs in source order. All sources share one host throttle, so together
+    they never exceed `concurrency` requests or the request rate allowed
+    for the host, plus one circuit breaker and one parse pool.
+    """
+    sources = sources or load_sources()
+    if seen_index is None:
+        seen_index = SeenBookIndex()
+    if len(sources) == 1:
+        pages = fetch_pages(concurrency, min_interval, incremental, seen_index, policy, allow_partial,
+                            parse_workers, url=sources[0].url)
+        return [(sources[0], pages)]
+
+    throttle = HostThrottle(concurrency, min_interval)
+    breaker = CircuitBreaker()
+    parse_pool = ParsePool(parse_workers) if parse_workers > 0 else None
+    print(f"[INFO] Scraping {len(sources)} sources: {', '.join(source.name for source in sources)}")
+    try:
+        with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+            futures = [pool.submit(fetch_pages, concurrency, min_interval, incremental, seen_index, policy,
+                                   allow_partial, parse_workers, source.url, throttle, breaker, parse_pool,
+                                   source.name)
+                       for source in sources]
+            return [(source, future.result()) for source, future in zip(sources, futures)]
+    finally:
+        if parse_pool is not None:
+            parse_pool.close()
+
+def filter_sources(source_pages, seen_index=None, mark_still_free=MARK_STILL_FREE):
+    """
+    Merges the free books of every source in source order, keeping the
+    first appearance of each ASIN. Books are labelled with their source
+    when there is more than one.
+    """
+    books = []
+    seen_keys = set()
+    for source, pages in source_pages:
+        label = (source.label or source.name) if len(source_pages) > 1 else None
+        books.extend(filter_books(pages, seen_index, mark_still_free, seen_keys, label))
+    return books
+
+def source_sections(books):
+    """
+    Groups books into (source label, books) sections, in first-seen order.
+    """
+    sections = {}
+    for book in books:
+        sections.setdefault(book.source, []).append(book)
+    return list(sections.items())
+
+# Function to fetch, parse and filter books from all pages
+@profiled("fetch_books")
+def fetch_books(concurrency=FETCH_CONCURRENCY, min_interval=MIN_REQUEST_INTERVAL,
+                incremental=INCREMENTAL, mark_still_free=MARK_STILL_FREE, seen_index=None,
+                policy=None, allow_partial=ALLOW_PARTIAL, store=None, parse_workers=PARSE_WORKERS,
+                sources=None):
+    """
+    Fetches every source (load_sources() unless given) and returns its free
+    books, recording what was seen in the store when one is given.
+    """
+    if seen_index is None:
+        # The book store keeps the same history, so it is the seen-book index when enabled
+        seen_index = store if store is not None else SeenBookIndex()
+    source_pages = fetch_sources(sources, concurrency, min_interval, incremental, seen_index, policy,
+                                 allow_partial, parse_workers)
+    if store is not None:
+        record_books_in_store([page for _, pages in source_pages for page in pages], store)
+    return filter_sources(source_pages, seen_index, mark_still_free)
+
+def history_sections(books, store):
+    """
+    Groups today's books into (heading, books) sections using the book
+    store: books first seen today, then books free for more than one day
+    grouped by the start of their streak (longest first), then the rest.
+    """
+    yesterday = (date.fromisoformat(store.today) - timedelta(days=1)).isoformat()
+    new_asins = {book.asin for book in store.new_today()}
+    free_since = {book.asin: since for book, since in store.still_free_since(yesterday)}
+    new_books, other_books, streaks = [], [], {}
+    for book in books:
+        if book.asin in new_asins:
+            new_books.append(book)
+        elif book.asin in free_since:
+            streaks.setdefault(free_since[book.asin], []).append(book)
+        else:
+            other_books.append(book)
+    sections = [("New today", new_books)]
+    for since in sorted(streaks):
+        heading = f"Still free since {date.fromisoformat(since).strftime('%d-%m-%Y')}"
+        sections.append((heading, streaks[since]))
+    sections.append(("Free today", other_books))
+    return [(heading, section) for heading, section in sections if section]
+
+# ── HTML templates, built once at import ──────────────────────────────────────
+
+# Post styles; inlined into documents, referenced or inlined once by fragments
+# Shared post stylesheet, scoped to the post's own classes; see the notes at its top
+STYLESHEET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kindle_books.css")
+with open(STYLESHEET_FILE, 'r', encoding='utf-8') as _f:
+    STYLESHEET = re.sub(r"/\*.*?\*/", "", _f.read(), flags=re.DOTALL)
+
+# Page-wide rules, only for standalone documents where the page is ours
+DOCUMENT_STYLESHEET = """
+            body {
+                font-family: Arial, sans-serif;
+                margin: 20px;
+            }
+        """
 
-    # Tamil paragraph content
-    paragraph_top = """
+# Document head with a style block for better maintainability
+HTML_HEAD = """
+    <!DOCTYPE html>
+    <html lang="ta">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">      
+        <title>Kindle Books</title>
+        <style>{stylesheet}</style>
+    </head>
+    <body>
+    """
+
+# Tamil paragraph content
+PARAGRAPH_TOP = """
     <p class="paragraph">
     
         <strong>அன்பார்ந்த புத்தக வாசகர்களே!</strong><br><br>
@@ -452,7 +647,7 @@ def generate_html_from_excel(excel_file, output_html_file):
 
     </p>
     """
-    paragraph_bottom = """
+PARAGRAPH_BOTTOM = """
     <p class="paragraph">
         <strong>அமேசான் <span style='color:orange'>கிண்டிலில்</span></strong> இருந்து இலவசமாக புத்தகத்தை வாங்குவது எப்படி என்று தெரிந்து கொள்ள 
         <a href="https://receiverindia.blogspot.com/2020/05/how-to-buy-free-books-in-amazon-kindle_7.html">இங்கே கிளிக் செய்யவும்.</a><br><br>
@@ -467,92 +662,212 @@ def generate_html_from_excel(excel_file, output_html_file):
     </p>
     """
 
-    # Start the HTML content with a style block for better maintainability
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="ta">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">      
-        <title>Kindle Books</title>
-        <style>
-            body {
-                font-family: Arial, sans-serif;
-                margin: 20px;
-            }
-            .paragraph {
-                text-align: center;
-                font-size: 18px;
-                line-height: 1.8;
-                margin-bottom: 40px;
-            }
-            .book-container {
-                display: flex;
-                flex-wrap: wrap;
-                justify-content: center;
-                gap: 20px;
-            }
-            .book-item {
-                text-align: center;
-                width: 200px;
-            }
-            .book-item img {
-                width: 150px;
-                height: auto;
-            }
-            .book-item a {
-                display: block;
-                margin-top: 10px;
-                font-size: 16px;
-                color: #0066cc;
-                text-decoration: none;
-            }
-            .book-item a:hover {
-                text-decoration: underline;
-            }
-        </style>
-    </head>
-    <body>
-    """
-
-    # Add the top paragraph
-    html_content += paragraph_top
+SECTION_HEADING = '<h2 class="section-title">{heading}</h2>\n'.format
+PART_NAV_START = '<p class="part-nav">'
+PART_NAV_END = '</p>\n'
+PART_LINK = '<a href="{url}">Part {part}</a>'.format
+PART_CURRENT = '<strong>Part {part} of {total}</strong>'.format
+BOOK_CONTAINER_START = '<div class="book-container">\n'
+BOOK_CONTAINER_END = '</div>\n'
 
-    # Start the book container
-    html_content += '<div class="book-container">\n'
+HTML_TAIL = """
+    </body>
+    </html>
+    """
 
-    # Generate a div for each row in the dataframe
-    for _, row in df.iterrows():
-        title = row['Title']
-        link = row['Link']
-        image_url = row['Image URL']
-        
-        html_content += f'''
+# One card per book; every value is HTML-escaped before formatting
+BOOK_ITEM = f'''
         <div class="book-item">
-            <img src="{image_url}" alt="{title}">
-            <a href="{link}" target="_blank">{title}</a>
+            <img src="{{image_url}}" alt="{{title}}" width="{COVER_WIDTH}" height="{COVER_HEIGHT}" loading="lazy" decoding="async">
+            <a href="{{link}}" target="_blank">{{title}}</a>
         </div>
         '''
 
-    # Close the book container
-    html_content += '</div>\n'
+_NEWLINE_RUN = re.compile(r"\s*\n\s*")
+_CSS_SPACE = re.compile(r"\s*([{};:,])\s*")
+
+def _minify(markup):
+    # Only whitespace runs spanning a line break collapse, so spacing within a line is kept
+    return _NEWLINE_RUN.sub(" ", markup).strip()
+
+def _minify_css(css):
+    return _CSS_SPACE.sub(r"\1", re.sub(r"\s+", " ", css)).replace(";}", "}").strip()
+
+def _template(markup):
+    return _minify(markup) if MINIFY else markup
+
+_stylesheet = _minify_css(STYLESHEET) if MINIFY else STYLESHEET
+_document_stylesheet = _minify_css(DOCUMENT_STYLESHEET + STYLESHEET) if MINIFY else DOCUMENT_STYLESHEET + STYLESHEET
+HTML_HEAD = _template(HTML_HEAD.replace("{stylesheet}", _document_stylesheet))
+PARAGRAPH_TOP = _template(PARAGRAPH_TOP)
+PARAGRAPH_BOTTOM = _template(PARAGRAPH_BOTTOM)
+HTML_TAIL = _template(HTML_TAIL)
+render_book_item = _template(BOOK_ITEM).format
+
+# Fragments carry no document shell: nothing when the theme has the styles, a link to the
+# shared stylesheet, or the scoped styles once
+if STYLESHEET_URL == "theme":
+    FRAGMENT_HEAD = ""
+elif STYLESHEET_URL:
+    FRAGMENT_HEAD = f'<link rel="stylesheet" href="{escape(STYLESHEET_URL, quote=True)}">\n'
+else:
+    FRAGMENT_HEAD = f"<style>{_stylesheet}</style>\n"
+FRAGMENT_TAIL = ""
 
-    # Add the bottom paragraph
-    html_content += paragraph_bottom
+_AMAZON_IMAGE_HOSTS = ("media-amazon.com", "images-amazon.com", "ssl-images-amazon.com")
+_IMAGE_SIZE = re.compile(r"(\.[^./]*?)?\.(jpe?g|png|gif|webp)$", re.IGNORECASE)
 
-    # Close the HTML tags
-    html_content += """
-    </body>
-    </html>
+def cover_url(url):
+    """
+    Rewrites an Amazon cover URL to the width shown in the post
+    (._SX150_.jpg) instead of the search-result size, e.g. ._AC_UY218_.jpg.
+    Other URLs are returned unchanged.
     """
+    if not url or not urlparse(url).netloc.endswith(_AMAZON_IMAGE_HOSTS):
+        return url
+    return _IMAGE_SIZE.sub(lambda m: f"._SX{COVER_WIDTH}_.{m.group(2)}", url, count=1)
 
-    # Write the content to the output HTML file
+def _escape(value):
+    # Missing values (None, or NaN from an old spreadsheet) render as empty
+    if value is None or value != value:
+        return ""
+    return escape(str(value), quote=True)
+
+def render_part_nav(part, total, urls):
+    """
+    "Part k of n" line linking the other parts whose URL is known.
+    part is 1-based; urls holds one URL (or None) per part.
+    """
+    items = []
+    for k, url in enumerate(urls, start=1):
+        if k == part:
+            items.append(PART_CURRENT(part=k, total=total))
+        elif url:
+            items.append(PART_LINK(url=_escape(url), part=k))
+    return PART_NAV_START + " ".join(items) + PART_NAV_END
+
+def render_html(books, out, sections=None, mode=None, nav=None):
+    """
+    Streams the blog post for an iterable of Books into a writable
+    text stream (file or buffer), one chunk per book, so memory stays flat
+    however many books there are. With sections, a list of (heading, books)
+    pairs, each group gets its own heading and container instead. mode is
+    "document" or "fragment" and defaults to RENDER_MODE. nav, when given,
+    is written above and below the books.
+    Returns the number of books rendered.
+    """
+    started = time.perf_counter()
+    head, tail = (HTML_HEAD, HTML_TAIL) if (mode or RENDER_MODE) == "document" else (FRAGMENT_HEAD, FRAGMENT_TAIL)
+    count = 0
+    size = out.write(head)
+    size += out.write(PARAGRAPH_TOP)
+    if nav:
+        size += out.write(nav)
+    for heading, section_books in sections or [(None, books)]:
+        if heading:
+            size += out.write(SECTION_HEADING(heading=_escape(heading)))
+        size += out.write(BOOK_CONTAINER_START)
+        for book in section_books:
+            title = _escape(book.title)
+            image_url = _escape(cover_url(book.image_url))
+            size += out.write(render_book_item(title=title, link=_escape(book.link), image_url=image_url))
+            count += 1
+        size += out.write(BOOK_CONTAINER_END)
+    if nav:
+        size += out.write(nav)
+    size += out.write(PARAGRAPH_BOTTOM)
+    size += out.write(tail)
+    metrics.observe("render_seconds", time.perf_counter() - started)
+    metrics.observe("render_books", count)
+    metrics.observe("render_output_chars", size)
+    return count
+
+def shard_sections(sections, max_books=SHARD_MAX_BOOKS, max_bytes=SHARD_MAX_BYTES):
+    """
+    Splits (heading, books) sections into parts of at most max_books books
+    and max_bytes bytes of rendered book cards, keeping book order. A
+    section cut across parts repeats its heading in the next part.
+    Returns a list of parts, each a list of sections; always at least one.
+    """
+    parts = [[]]
+    books_in_part = bytes_in_part = 0
+    for heading, section_books in sections:
+        current = None
+        for book in section_books:
+            card = len(render_book_item(title=_escape(book.title), link=_escape(book.link),
+                                        image_url=_escape(cover_url(book.image_url))).encode("utf-8"))
+            full = (max_books and books_in_part >= max_books) or (max_bytes and bytes_in_part + card > max_bytes)
+            if full and books_in_part:
+                parts.append([])
+                books_in_part = bytes_in_part = 0
+                current = None
+            if current is None:
+                current = (heading, [])
+                parts[-1].append(current)
+            current[1].append(book)
+            books_in_part += 1
+            bytes_in_part += card
+    return parts
+
+def save_parts(parts, path=PARTS_FILE):
+    """
+    Writes shard_sections output as JSON, so Automation_Working can publish
+    the same parts later.
+    """
+    data = [[[heading, [book.to_row() for book in books]] for heading, books in part] for part in parts]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+def load_parts(path=PARTS_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [[(heading, [Book.from_row(row) for row in rows]) for heading, rows in part] for part in data]
+
+def render_part(parts, k, urls, mode=None):
+    """
+    Renders part k (0-based) of a sharded post with its part navigation.
+    """
+    buffer = io.StringIO()
+    nav = render_part_nav(k + 1, len(parts), urls) if len(parts) > 1 else None
+    render_html(None, buffer, parts[k], mode, nav)
+    return buffer.getvalue()
+
+def generate_html(books, output_html_file, sections=None):
+    """
+    Renders the blog post for an iterable of Books straight into
+    output_html_file.
+    """
     with open(output_html_file, 'w', encoding='utf-8') as file:
-        file.write(html_content)
+        render_html(books, file, sections)
 
     print(f"HTML file generated: {output_html_file}")
 
-# Usage example
-excel_file = 'kindle_books_filtered_all_pages.xlsx'  # Replace with your Excel file name
-output_html_file = 'output.html'  # Replace with your desired output HTML file name
-generate_html_from_excel(excel_file, output_html_file)
+@profiled("generate_html_from_excel")
+def generate_html_from_excel(excel_file, output_html_file):
+    # Read the Excel file; only this legacy path needs pandas
+    import pandas as pd
+    try:
+        df = pd.read_excel(excel_file)
+    except FileNotFoundError:
+        print(f"Error: The file {excel_file} was not found.")
+        return
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return
+
+    generate_html(map(Book.from_row, df.to_dict("records")), output_html_file)
+
+def main():
+    # Same fetch, filter and render stages as the pipeline, so both entry points build the same post
+    from pipeline import STAGES, PipelineContext, run_pipeline
+    ctx = PipelineContext(publish=False)
+    try:
+        run_pipeline(ctx, [(name, stage) for name, stage in STAGES if name != "publish"])
+    finally:
+        if ctx.store is not None:
+            ctx.store.close()
+
+if __name__ == '__main__':
+    main()
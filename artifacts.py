@@ -0,0 +1,76 @@
+import os
+import csv
+import json
+import threading
+from book import ROW_COLUMNS, to_rows
+
+# Audit artifacts written after rendering, comma separated: jsonl, csv, xlsx
+ARTIFACT_FORMATS = os.getenv("KINDLE_ARTIFACTS", "jsonl")
+
+JSONL_FILE = "kindle_books.jsonl"
+CSV_FILE = "kindle_books.csv"
+EXCEL_FILE = "kindle_books_filtered_all_pages.xlsx"
+
+def _columns(rows):
+    # Optional columns such as "Still Free" only get a header when some row has them
+    present = set()
+    for row in rows:
+        present.update(row)
+    return [column for column in ROW_COLUMNS if column in present]
+
+def write_jsonl(rows, path=JSONL_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+
+def write_csv(rows, path=CSV_FILE):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=_columns(rows))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def write_excel(rows, path=EXCEL_FILE):
+    import pandas as pd  # Only the Excel artifact needs pandas/openpyxl
+    pd.DataFrame(rows, columns=_columns(rows)).to_excel(path, index=False)
+
+WRITERS = {
+    "jsonl": (write_jsonl, JSONL_FILE),
+    "csv": (write_csv, CSV_FILE),
+    "xlsx": (write_excel, EXCEL_FILE),
+}
+
+def parse_formats(formats):
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    return [fmt.strip().lower() for fmt in formats if fmt.strip()]
+
+def write_artifacts(books, formats=ARTIFACT_FORMATS):
+    """
+    Writes the Books in every requested format. A failing writer is
+    reported and skipped, since artifacts are an audit trail only.
+    """
+    rows = to_rows(books)
+    written = []
+    for fmt in parse_formats(formats):
+        if fmt not in WRITERS:
+            print(f"[WARNING] Unknown artifact format '{fmt}'. Skipping.")
+            continue
+        writer, path = WRITERS[fmt]
+        try:
+            writer(rows, path)
+            written.append(path)
+            print(f"[INFO] Data successfully saved to {path}")
+        except Exception as e:
+            print(f"[ERROR] Could not write {path}: {e}")
+    return written
+
+def write_artifacts_in_background(books, formats=ARTIFACT_FORMATS):
+    """
+    Starts write_artifacts on a worker thread and returns the thread. The
+    thread is not a daemon, so the interpreter waits for it before exiting.
+    """
+    thread = threading.Thread(target=write_artifacts, args=(list(books), formats),
+                              name="artifact-writer")
+    thread.start()
+    return thread
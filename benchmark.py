@@ -0,0 +1,397 @@
+"""
+Offline benchmark for the scrape -> render -> publish pipeline.
+
+Serves synthetic (or recorded) Amazon search pages and a fake Blogger
+posts.insert endpoint from a local HTTP server, then times fetch_books,
+the parser, generate_html / generate_html_from_excel and post_to_blogger
+against it. Needs no network, so it runs in CI.
+
+It also times a cold `import pipeline` in a fresh interpreter and exits
+non-zero when that exceeds --import-budget-ms or pulls in a heavy library
+the scrape -> render -> publish path should only load on demand.
+
+    python benchmark.py --pages 20 --books 5000
+    python benchmark.py --recorded recorded_pages/ --json bench.json
+
+Recorded pages are read from <dir>/page-<n>.html.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import itertools
+import threading
+import resource
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Never touch the real cache or throttle while benchmarking
+os.environ.setdefault("KINDLE_CACHE_MODE", "off")
+os.environ.setdefault("KINDLE_MIN_REQUEST_INTERVAL", "0")
+
+# Cold-start budget for `import pipeline` in a fresh interpreter
+IMPORT_BUDGET_MS = float(os.getenv("KINDLE_IMPORT_BUDGET_MS", "400"))
+
+# Libraries that importing the pipeline must not load; each belongs to one stage only
+LAZY_MODULES = ("pandas", "numpy", "openpyxl", "googleapiclient", "google.oauth2", "httplib2")
+
+# ── Stand-in search pages ──────────────────────────────────────────────────────
+
+BOOK_CARD = (
+    '<div data-asin="{asin}" data-component-type="s-search-result" '
+    'class="sg-col-20-of-24 s-result-item s-asin sg-col-0-of-12 sg-col-16-of-20 sg-col s-widget-spacing-small">'
+    '<div class="sg-col-inner"><div class="s-widget-container s-spacing-small">'
+    '<span class="rush-component"><a class="a-link-normal s-no-outline" '
+    'href="/Book-Title-{n}/dp/{asin}/ref=sr_1_{n}?dib=xyz&qid=1700000000&s=digital-text&sr=1-{n}">'
+    '<div class="a-section aok-relative s-image-fixed-height">'
+    '<img class="s-image" src="https://m.media-amazon.com/images/I/{asin}._AC_UY218_.jpg" '
+    'srcset="https://m.media-amazon.com/images/I/{asin}._AC_UY436_.jpg 2x" alt=""></div></a></span>'
+    '<div class="a-section a-spacing-none puis-padding-right-small s-title-instructions-style">'
+    '<h2 class="a-size-medium a-spacing-none a-color-base a-text-normal"><span>Book Title {n}: A Synthetic Story</span></h2>'
+    '</div><div class="a-row a-size-base a-color-secondary"><span class="a-size-base">by Author {n}</span></div>'
+    '<div class="a-row"><span class="a-price"><span class="a-offscreen">₹{price}</span>'
+    '<span class="a-price-whole">{price}</span></span></div>'
+    '{offer}</div></div></div>'
+)
+FREE_OFFER = '<div data-cy="secondary-offer-recipe" class="a-section a-spacing-none"><span>Or ₹0 to buy</span></div>'
+FILLER = '<div class="a-section filler"><span class="a-size-small">{text}</span></div>'
+
+def synthetic_page(page_number, last_page, per_page=16, free_ratio=0.5, seed=0):
+    """
+    Builds one search result page with pagination and, on the last page,
+    the disabled s-pagination-next state.
+    """
+    rng = random.Random(seed * 100003 + page_number)
+    cards = []
+    for i in range(per_page):
+        n = (page_number - 1) * per_page + i + 1
+        cards.append(BOOK_CARD.format(
+            asin=f"B0{n:08d}", n=n, price=rng.randint(10, 99),
+            offer=FREE_OFFER if rng.random() < free_ratio else "",
+        ))
+        # Real pages carry a lot of markup around the results
+        cards.append(FILLER.format(text="x" * 400) * 5)
+    if page_number >= last_page:
+        next_item = '<span class="s-pagination-item s-pagination-next s-pagination-disabled" aria-disabled="true">Next</span>'
+    else:
+        next_item = f'<a href="/s?page={page_number + 1}" class="s-pagination-item s-pagination-next s-pagination-button s-pagination-separator">Next</a>'
+    shown = sorted({1, page_number, last_page})
+    items = "".join(f'<span class="s-pagination-item">{n}</span>' for n in shown)
+    pagination = f'<span class="s-pagination-strip">{items}{next_item}</span>'
+    head = '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Amazon.in</title>' + '<script>var x=1;</script>' * 50 + '</head>'
+    body = '<body><div id="search"><div class="s-main-slot s-result-list">' + "".join(cards) + '</div>' + pagination + '</div></body></html>'
+    return (head + body).encode("utf-8")
+
+class StandInServer:
+    """
+    Local HTTP server for search pages (GET /s?...&page=N) and the Blogger
+    calls the publisher makes: posts.list (GET /blogger/v3/blogs/<id>/posts),
+    posts.insert (POST to the same path), posts.patch and posts.delete
+    (PATCH and DELETE /blogger/v3/blogs/<id>/posts/<post id>).
+    """
+    def __init__(self, last_page=20, per_page=16, recorded_dir=None):
+        self.last_page = last_page
+        self.per_page = per_page
+        self.recorded_dir = recorded_dir
+        self.pages = {}
+        self.posts = {}
+        self.post_ids = itertools.count(1)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.startswith("/blogger/"):
+                    blog_id = url.path.split("/")[4]
+                    items = [post for post in server.posts.values() if post["blog"]["id"] == blog_id]
+                    self._send_json({"kind": "blogger#postList", "items": items})
+                    return
+                page_number = int(parse_qs(url.query).get("page", ["1"])[0])
+                self._send(200, "text/html; charset=utf-8", server.page(page_number))
+
+            def do_POST(self):
+                body = self._read_json()
+                post_id = str(next(server.post_ids))
+                server.posts[post_id] = dict(body, kind="blogger#post", id=post_id,
+                                             blog={"id": urlparse(self.path).path.split("/")[4]},
+                                             url=f"http://blog.invalid/{post_id}.html")
+                self._send_json(server.posts[post_id])
+
+            def do_PATCH(self):
+                post = server.posts.get(urlparse(self.path).path.rstrip("/").split("/")[-1])
+                if post is None:
+                    self._send_json({"error": {"code": 404, "message": "Not Found"}}, 404)
+                    return
+                post.update(self._read_json())
+                self._send_json(post)
+
+            def do_DELETE(self):
+                if server.posts.pop(urlparse(self.path).path.rstrip("/").split("/")[-1], None) is None:
+                    self._send_json({"error": {"code": 404, "message": "Not Found"}}, 404)
+                    return
+                self._send(204, "application/json", b"")
+
+            def _read_json(self):
+                return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            def _send_json(self, reply, status=200):
+                self._send(status, "application/json", json.dumps(reply).encode("utf-8"))
+
+            def _send(self, status, content_type, payload):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def page(self, page_number):
+        if page_number not in self.pages:
+            if self.recorded_dir:
+                path = os.path.join(self.recorded_dir, f"page-{page_number}.html")
+                with open(path, 'rb') as f:
+                    self.pages[page_number] = f.read()
+            else:
+                self.pages[page_number] = synthetic_page(page_number, self.last_page, self.per_page)
+        return self.pages[page_number]
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def count_recorded_pages(directory):
+    n = 0
+    while os.path.exists(os.path.join(directory, f"page-{n + 1}.html")):
+        n += 1
+    return n
+
+# ── Measurements ───────────────────────────────────────────────────────────────
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def synthetic_books(count):
+    from book import Book
+    return [Book(
+        asin=f"B0{n:08d}",
+        title=f"Book Title {n}: A Synthetic Story",
+        price="49",
+        link=f"https://www.amazon.in/dp/B0{n:08d}?tag=receiver06-21",
+        image_url=f"https://m.media-amazon.com/images/I/B0{n:08d}._AC_UY218_.jpg",
+    ) for n in range(count)]
+
+def bench_import(module="pipeline", repeat=3):
+    """
+    Imports module in fresh interpreters and reports the best cumulative
+    import time from -X importtime, plus any LAZY_MODULES it dragged in.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    probe = (f"import sys, json; import {module}; "
+             f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))")
+    best = None
+    loaded = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                              cwd=here, capture_output=True, text=True, check=True)
+        loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+        for line in proc.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                cumulative_ms = int(fields[1]) / 1000
+                best = cumulative_ms if best is None else min(best, cumulative_ms)
+    return {f"import_{module}_ms": best, "import_heavy_modules": ",".join(loaded) or "none"}
+
+def bench_parse(server, pages, repeat=3):
+    import search_parser
+    backends = ["soup"] + (["lxml"] if search_parser.lxml_html is not None else [])
+    contents = [server.page(n) for n in range(1, pages + 1)]
+    results = {}
+    for backend in backends:
+        best = None
+        for _ in range(repeat):
+            _, elapsed = timed(lambda: [search_parser.parse_search_page(c, backend) for c in contents])
+            best = elapsed if best is None else min(best, elapsed)
+        results[f"parse_ms_per_page_{backend}"] = best * 1000 / len(contents)
+    return results
+
+def bench_fetch(server, workdir, concurrency, parse_workers=0):
+    import Blog_generator
+    from seen_books import SeenBookIndex
+    # Passed explicitly, so a search_sources.json in the working directory never sends the run online
+    sources = [Blog_generator.SearchSource("stand-in", f"{server.url}/s?i=digital-text&s=date-desc-rank")]
+    index = SeenBookIndex(path=os.path.join(workdir, "seen_books.json"))
+    books, elapsed = timed(Blog_generator.fetch_books, concurrency=concurrency, min_interval=0, seen_index=index,
+                           parse_workers=parse_workers, sources=sources)
+    pages = server.last_page
+    return {
+        "fetch_books_s": elapsed,
+        "fetch_pages": pages,
+        "fetch_books_found": len(books),
+        "pages_per_sec": pages / elapsed if elapsed else 0.0,
+    }, books
+
+def bench_render(workdir, count):
+    import Blog_generator
+    books = synthetic_books(count)
+    out = os.path.join(workdir, "output.html")
+    _, elapsed = timed(Blog_generator.generate_html, books, out)
+    results = {
+        "render_books": count,
+        "render_ms_per_1k_books": elapsed * 1000 * 1000 / count,
+        "render_output_bytes": os.path.getsize(out),
+    }
+    try:
+        from artifacts import write_excel
+        from book import to_rows
+        excel = os.path.join(workdir, "books.xlsx")
+        write_excel(to_rows(books), excel)
+        _, elapsed = timed(Blog_generator.generate_html_from_excel, excel, out)
+        results["generate_html_from_excel_ms_per_1k_books"] = elapsed * 1000 * 1000 / count
+    except ImportError as e:
+        print(f"[WARNING] Skipping generate_html_from_excel benchmark: {e}")
+    return results
+
+def bench_publish(server, workdir, html_content, posts=5):
+    try:
+        import httplib2
+        from googleapiclient.discovery import build
+    except ImportError as e:
+        print(f"[WARNING] Skipping post_to_blogger benchmark: {e}")
+        return {}
+    import Automation_Working
+    service = build('blogger', 'v3', http=httplib2.Http(), static_discovery=True,
+                    client_options={"api_endpoint": f"{server.url}/blogger/"})
+    latencies = []
+    for i in range(posts):
+        _, elapsed = timed(Automation_Working.post_to_blogger, service, f"Benchmark post {i}", html_content)
+        latencies.append(elapsed)
+
+    # The daily upsert path: a first run inserts, a rerun without the local index finds and patches
+    targets = [Automation_Working.BlogTarget("bench")]
+    Automation_Working._service = service
+    cwd = os.getcwd()
+    upserts = []
+    try:
+        for run in range(2):
+            # Each run gets its own directory, so its published-post index starts empty
+            rundir = os.path.join(workdir, f"upsert-{run}")
+            os.makedirs(rundir)
+            os.chdir(rundir)
+            results, elapsed = timed(Automation_Working.publish_to_blogs, html_content, targets, mode="upsert")
+            upserts.append(elapsed)
+            if results[0]["action"] != ("inserted", "patched")[run]:
+                raise SystemExit(f"Upsert run {run + 1} {results[0]['action']}: {results[0]['error']}")
+
+        # A rerun that splits the post into fewer parts patches the parts it keeps and deletes the rest
+        import Blog_generator
+        targets = [Automation_Working.BlogTarget("bench-parts")]
+        rundir = os.path.join(workdir, "upsert-parts")
+        os.makedirs(rundir)
+        os.chdir(rundir)
+        for max_books in (2, 3):
+            parts = Blog_generator.shard_sections([(None, synthetic_books(6))], max_books=max_books)
+            render = lambda k, urls: Blog_generator.render_part(parts, k, urls)
+            results, elapsed = timed(Automation_Working.publish_parts, render, len(parts), targets, mode="upsert")
+        actions = [result["action"] for result in results]
+        left = sorted(post["title"] for post in server.posts.values() if post["blog"]["id"] == "bench-parts")
+        if actions != ["patched", "patched", "removed"] or len(left) != 2 or not left[-1].endswith("(Part 2 of 2)"):
+            raise SystemExit(f"Re-sharded publish gave {actions}, leaving {left}")
+        upserts.append(elapsed)
+    finally:
+        os.chdir(cwd)
+        Automation_Working._service = None
+    return {
+        "post_to_blogger_ms_avg": sum(latencies) * 1000 / len(latencies),
+        "post_to_blogger_ms_max": max(latencies) * 1000,
+        "upsert_insert_ms": upserts[0] * 1000,
+        "upsert_patch_ms": upserts[1] * 1000,
+        "upsert_fewer_parts_ms": upserts[2] * 1000,
+        "post_body_bytes": len(html_content.encode("utf-8")),
+    }
+
+def run_benchmark(pages=20, per_page=16, books=5000, concurrency=4, recorded_dir=None, publish=True,
+                  parse_workers=0):
+    if recorded_dir:
+        pages = count_recorded_pages(recorded_dir)
+        if not pages:
+            raise SystemExit(f"No page-1.html found in {recorded_dir}")
+    started = time.perf_counter()
+    results = bench_import()
+    with tempfile.TemporaryDirectory() as workdir, StandInServer(pages, per_page, recorded_dir) as server:
+        fetch_results, found = bench_fetch(server, workdir, concurrency, parse_workers)
+        results.update(fetch_results)
+        results.update(bench_parse(server, pages))
+        results.update(bench_render(workdir, books))
+        if publish:
+            import io
+            import Blog_generator
+            buffer = io.StringIO()
+            Blog_generator.render_html(found, buffer)
+            results.update(bench_publish(server, workdir, buffer.getvalue()))
+    results["end_to_end_s"] = time.perf_counter() - started
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--pages", type=int, default=20, help="synthetic result pages")
+    parser.add_argument("--per-page", type=int, default=16, help="results per synthetic page")
+    parser.add_argument("--books", type=int, default=5000, help="books for the render benchmark")
+    parser.add_argument("--concurrency", type=int, default=4, help="fetch concurrency")
+    parser.add_argument("--parse-workers", type=int, default=0, help="parse in this many processes while fetching")
+    parser.add_argument("--recorded", help="directory of recorded page-<n>.html files")
+    parser.add_argument("--no-publish", action="store_true", help="skip the Blogger benchmark")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--profile", nargs="?", const="all", metavar="REGIONS",
+                        help="write cProfile/tracemalloc/flamegraph profiles of the benchmarked code")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help="fail when a cold `import pipeline` takes longer")
+    args = parser.parse_args(argv)
+    if args.profile:
+        import profiling
+        profiling.enable(args.profile)
+
+    results = run_benchmark(args.pages, args.per_page, args.books, args.concurrency,
+                            args.recorded, not args.no_publish, args.parse_workers)
+    print("\n📊 Benchmark results")
+    for key, value in results.items():
+        print(f"  {key:<42} {value:,.2f}" if isinstance(value, float) else f"  {key:<42} {value}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    import_ms = results["import_pipeline_ms"]
+    if import_ms > args.import_budget_ms:
+        print(f"❌ Cold import took {import_ms:.0f} ms, over the {args.import_budget_ms:.0f} ms budget")
+        sys.exit(1)
+    if results["import_heavy_modules"] != "none":
+        print(f"❌ Importing the pipeline loaded {results['import_heavy_modules']}; import them where they are used")
+        sys.exit(1)
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+from typing import NamedTuple, Optional
+
+# Column names of the exported rows; kept from the original spreadsheet
+ROW_COLUMNS = ("ASIN", "Title", "Price", "Link", "Image URL", "First Seen", "Still Free", "Source")
+
+class Book(NamedTuple):
+    """
+    One free book as handed from the scraper to the renderer, publisher
+    and artifact writers. still_free is None unless it was looked up;
+    source is the search it came from when several are scraped.
+    """
+    asin: Optional[str]
+    title: str
+    price: str
+    link: str
+    image_url: Optional[str]
+    first_seen: Optional[str] = None
+    still_free: Optional[bool] = None
+    source: Optional[str] = None
+
+    def to_row(self):
+        row = {
+            "ASIN": self.asin,
+            "Title": self.title,
+            "Price": self.price,
+            "Link": self.link,
+            "Image URL": self.image_url,
+            "First Seen": self.first_seen,
+        }
+        if self.still_free is not None:
+            row["Still Free"] = self.still_free
+        if self.source is not None:
+            row["Source"] = self.source
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Builds a Book from an exported row or an old spreadsheet record,
+        which may lack every column but Title and Link.
+        """
+        still_free = row.get("Still Free")
+        return cls(
+            asin=row.get("ASIN"),
+            title=row.get("Title"),
+            price=row.get("Price"),
+            link=row.get("Link"),
+            image_url=row.get("Image URL"),
+            first_seen=row.get("First Seen"),
+            still_free=None if still_free is None else bool(still_free),
+            source=row.get("Source"),
+        )
+
+def to_rows(books):
+    return [book.to_row() for book in books]
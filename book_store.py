@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+from book import Book
+
+# SQLite file holding the history of every book seen in search results; empty disables it
+BOOK_STORE_FILE = os.getenv("KINDLE_BOOK_STORE_FILE", "books.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    asin        TEXT PRIMARY KEY,
+    title       TEXT,
+    price       TEXT,
+    link        TEXT,
+    image_url   TEXT,
+    first_seen  TEXT NOT NULL,
+    last_seen   TEXT NOT NULL,
+    free_since  TEXT,
+    last_free   TEXT,
+    free_days   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS books_first_seen ON books (first_seen);
+CREATE INDEX IF NOT EXISTS books_last_seen ON books (last_seen);
+CREATE INDEX IF NOT EXISTS books_last_free ON books (last_free, free_since);
+"""
+
+# Columns are evaluated against the old row, so free_since/free_days see the previous last_free
+UPSERT = """
+INSERT INTO books (asin, title, price, link, image_url, first_seen, last_seen, free_since, last_free, free_days)
+VALUES (:asin, :title, :price, :link, :image_url, :today, :today,
+        CASE WHEN :is_free THEN :today END, CASE WHEN :is_free THEN :today END, :is_free)
+ON CONFLICT (asin) DO UPDATE SET
+    title = coalesce(excluded.title, title),
+    price = coalesce(excluded.price, price),
+    link = coalesce(excluded.link, link),
+    image_url = coalesce(excluded.image_url, image_url),
+    last_seen = :today,
+    free_since = CASE
+        WHEN NOT :is_free THEN free_since
+        WHEN last_free IN (:today, :yesterday) THEN free_since
+        ELSE :today END,
+    free_days = free_days + (:is_free AND coalesce(last_free, '') <> :today),
+    last_free = CASE WHEN :is_free THEN :today ELSE last_free END
+"""
+
+BOOK_COLUMNS = "asin, title, price, link, image_url, first_seen, free_since"
+
+class BookStore:
+    """
+    Embedded history of every book seen in search results, keyed by ASIN.
+
+    Each row keeps first_seen / last_seen, the start of the current free
+    streak (free_since), the last day the book was free (last_free) and the
+    number of distinct days it was free (free_days). Dates are ISO strings.
+
+    It also answers the seen-book lookups (is_known, first_seen,
+    is_still_free) of SeenBookIndex, so it replaces that index when enabled.
+    """
+    def __init__(self, path=BOOK_STORE_FILE, today=None):
+        self.path = path
+        self.today = (today or date.today()).isoformat()
+        # Source walks look books up from their own threads
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT count(*) FROM books").fetchone()[0]
+
+    def record(self, entries):
+        """
+        Upserts (asin, title, price, link, image_url, is_free) tuples for
+        today in a single transaction. Returns the number of entries.
+        """
+        yesterday = (date.fromisoformat(self.today) - timedelta(days=1)).isoformat()
+        params = [{
+            "asin": asin, "title": title, "price": price, "link": link, "image_url": image_url,
+            "is_free": int(bool(is_free)), "today": self.today, "yesterday": yesterday,
+        } for asin, title, price, link, image_url, is_free in entries]
+        with self._lock, self.conn:
+            self.conn.executemany(UPSERT, params)
+        return len(params)
+
+    def _seen(self, asin):
+        with self._lock:
+            return self.conn.execute("SELECT first_seen, free_since FROM books WHERE asin = ?", (asin,)).fetchone()
+
+    def is_known(self, asin):
+        # Books first seen today are not "known", so same-day reruns still crawl them
+        row = self._seen(asin)
+        return bool(row) and row[0] < self.today
+
+    def first_seen(self, asin):
+        row = self._seen(asin)
+        return row[0] if row else None
+
+    def is_still_free(self, asin):
+        row = self._seen(asin)
+        return bool(row and row[1]) and row[1] < self.today
+
+    def _book(self, row):
+        asin, title, price, link, image_url, first_seen, free_since = row
+        return Book(asin, title, price, link, image_url, first_seen,
+                    still_free=bool(free_since and free_since < self.today))
+
+    def new_today(self):
+        """
+        Books free today that were never seen before today.
+        """
+        rows = self.conn.execute(
+            f"SELECT {BOOK_COLUMNS} FROM books WHERE first_seen = ? AND last_free = ? ORDER BY title",
+            (self.today, self.today))
+        return [self._book(row) for row in rows]
+
+    def still_free_since(self, since):
+        """
+        Books free today that have been free every day since `since` (an
+        ISO date) or earlier, as (Book, free_since) pairs, longest first.
+        """
+        rows = self.conn.execute(
+            f"SELECT {BOOK_COLUMNS} FROM books WHERE last_free = ? AND free_since <= ? "
+            "ORDER BY free_since, title",
+            (self.today, since))
+        return [(self._book(row), row[-1]) for row in rows]
+
+    def free_streaks(self, min_days=2, limit=None):
+        """
+        Books free today for at least min_days days in a row, as
+        (Book, streak_days) pairs, longest streak first.
+        """
+        since = (date.fromisoformat(self.today) - timedelta(days=min_days - 1)).isoformat()
+        pairs = self.still_free_since(since)
+        if limit is not None:
+            pairs = pairs[:limit]
+        today = date.fromisoformat(self.today)
+        return [(book, (today - date.fromisoformat(free_since)).days + 1) for book, free_since in pairs]
@@ -0,0 +1,249 @@
+"""
+Resident scheduler for self-hosted deployments.
+
+Stays running between posts so the HTTP session, the Blogger service, its
+discovery document and access token (kept fresh by the token refresher)
+are already warm when the daily run starts. Runs the full pipeline at the
+KINDLE_SCHEDULE times and, optionally, warm-up runs at the
+KINDLE_WARM_SCHEDULE times that only refresh the session, token and
+discovery document. Warm-ups never scrape: the free list changes at 13:30
+IST, and pages or "free today" history recorded before then would be
+stale. For the same reason the publish run always fetches fresh pages,
+bypassing cached copies.
+
+    python daemon.py                 # run on the schedule until stopped
+    python daemon.py --once          # run the publish job once, now
+
+Every run takes an exclusive lock on KINDLE_LOCK_FILE and records its
+outcome there, so two daemons (or a daemon and a manual --once) never run
+at the same time and the post is published at most once per day.
+"""
+import os
+import sys
+import json
+import time
+import fcntl
+import signal
+import argparse
+import threading
+import traceback
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import metrics
+from page_cache import get_cache
+from pipeline import PipelineContext, run_pipeline
+
+# Daily publish times, HH:MM in SCHEDULE_TIMEZONE, comma separated
+PUBLISH_SCHEDULE = os.getenv("KINDLE_SCHEDULE", "13:35")
+
+# Optional warm-up runs (session, token and discovery document only), same format
+WARM_SCHEDULE = os.getenv("KINDLE_WARM_SCHEDULE", "")
+
+# Time zone the schedules are given in
+SCHEDULE_TIMEZONE = os.getenv("KINDLE_TIMEZONE", "Asia/Kolkata")
+
+# Locked while a run is in progress; holds the outcome of the last runs as JSON
+LOCK_FILE = os.getenv("KINDLE_LOCK_FILE", "kindle_daemon.lock")
+
+# Longest single sleep, so clock changes and host suspends are noticed
+MAX_SLEEP = 60
+
+def parse_times(spec):
+    """
+    Turns "13:35,18:00" into sorted (hour, minute) pairs.
+    """
+    times = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        hour, minute = (int(part) for part in item.split(":"))
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid schedule time '{item}'")
+        times.append((hour, minute))
+    return sorted(set(times))
+
+def next_run(now, publish_times, warm_times):
+    """
+    Returns (when, kind) for the first scheduled run after now; a publish
+    wins over a warm run at the same minute.
+    """
+    candidates = []
+    for kind, times in (("publish", publish_times), ("warm", warm_times)):
+        for hour, minute in times:
+            when = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if when <= now:
+                when += timedelta(days=1)
+            candidates.append((when, kind != "publish", kind))
+    when, _, kind = min(candidates)
+    return when, kind
+
+class RunLock:
+    """
+    Exclusive, non-blocking lock on a file that also stores the last run
+    and the last publish as JSON.
+    """
+    def __init__(self, path=LOCK_FILE):
+        self.path = path
+        self.fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+    def read(self):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        content = b""
+        while chunk := os.read(self.fd, 65536):
+            content += chunk
+        try:
+            return json.loads(content) if content.strip() else {}
+        except ValueError:
+            print(f"[WARNING] Ignoring unreadable lock file {self.path}")
+            return {}
+
+    def write(self, state):
+        payload = json.dumps(state, indent=2, ensure_ascii=False).encode("utf-8")
+        os.ftruncate(self.fd, 0)
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        os.write(self.fd, payload)
+        os.fsync(self.fd)
+
+def warm_up(publish=True):
+    """
+    Opens the scraper session and, when publishing, authenticates and loads
+    the Blogger discovery document, so the first run pays none of it.
+    """
+    import Blog_generator
+    from http_session import get_session
+    get_session(Blog_generator.FETCH_CONCURRENCY, Blog_generator.headers)
+    if not publish:
+        return
+    import Automation_Working
+    try:
+        Automation_Working.authenticate()
+        Automation_Working.get_discovery_document()
+        print("🔥 Blogger client ready.")
+    except Exception as e:
+        print(f"[WARNING] Blogger warm-up failed, the first publish will retry: {e}")
+
+def publish_run(record):
+    """
+    Runs the full pipeline on freshly fetched pages and fills in record.
+    A run that published nothing is recorded as "empty", not "done".
+    """
+    ctx = None
+    cache = get_cache()
+    mode = cache.mode
+    if mode == "on":
+        cache.mode = "refresh"
+    try:
+        ctx = PipelineContext()
+        run_pipeline(ctx)
+        # Nothing went live without publish results, so a later slot today may still try
+        record.update(status="done" if ctx.publish_results else "empty", books=len(ctx.books),
+                      published=[r.get("url") for r in ctx.publish_results if r.get("url")])
+    except Exception as e:
+        traceback.print_exc()
+        print(f"❌ Publish run failed: {e}")
+        record.update(status="failed", error=str(e))
+    finally:
+        cache.mode = mode
+        if ctx is not None and ctx.store is not None:
+            ctx.store.close()
+        metrics.export()
+        metrics.metrics.reset()
+
+def run_job(kind, lock, today):
+    """
+    Runs one scheduled job under the lock. A publish job is skipped when
+    today's post was already published by any run sharing the lock file.
+    """
+    if not lock.acquire():
+        print(f"⏭️ Another run holds {lock.path}. Skipping this {kind} run.")
+        return None
+    try:
+        state = lock.read()
+        last_publish = state.get("last_publish") or {}
+        if kind == "publish" and last_publish.get("date") == today and last_publish.get("status") == "done":
+            print(f"⏭️ Today's post was already published at {last_publish.get('finished_at')}. Skipping.")
+            return None
+
+        record = {"kind": kind, "date": today, "status": "running", "pid": os.getpid(),
+                  "started_at": datetime.now().astimezone().isoformat(timespec="seconds")}
+        state["last_run"] = record
+        lock.write(state)
+
+        print(f"🚀 Starting {kind} run...")
+        if kind == "publish":
+            publish_run(record)
+        else:
+            warm_up()
+            record.update(status="done")
+
+        record["finished_at"] = datetime.now().astimezone().isoformat(timespec="seconds")
+        state["last_run"] = record
+        if kind == "publish":
+            state["last_publish"] = record
+        lock.write(state)
+        print(f"🎉 {kind.capitalize()} run {record['status']}.")
+        return record
+    finally:
+        lock.release()
+
+def serve(publish_times, warm_times, tz, lock, stop):
+    while not stop.is_set():
+        when, kind = next_run(datetime.now(tz), publish_times, warm_times)
+        print(f"⏰ Next {kind} run at {when:%Y-%m-%d %H:%M %Z}")
+        while not stop.is_set():
+            remaining = (when - datetime.now(tz)).total_seconds()
+            if remaining <= 0:
+                break
+            stop.wait(min(remaining, MAX_SLEEP))
+        if not stop.is_set():
+            run_job(kind, lock, when.date().isoformat())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the daily Kindle blog pipeline on a schedule")
+    parser.add_argument("--schedule", default=PUBLISH_SCHEDULE, help="publish times, HH:MM,...")
+    parser.add_argument("--warm", default=WARM_SCHEDULE, help="warm-up times (no scraping), HH:MM,...")
+    parser.add_argument("--once", action="store_true", help="run the publish job now and exit")
+    args = parser.parse_args(argv)
+
+    tz = ZoneInfo(SCHEDULE_TIMEZONE)
+    lock = RunLock()
+    if args.once:
+        record = run_job("publish", lock, datetime.now(tz).date().isoformat())
+        return 1 if record and record["status"] == "failed" else 0
+
+    publish_times = parse_times(args.schedule)
+    if not publish_times:
+        raise SystemExit("No publish time in the schedule")
+    warm_times = parse_times(args.warm)
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    started = time.perf_counter()
+    warm_up()
+    print(f"🟢 Daemon ready in {time.perf_counter() - started:.2f}s; publishing daily at "
+          f"{args.schedule} {SCHEDULE_TIMEZONE}.")
+    serve(publish_times, warm_times, tz, lock, stop)
+    print("👋 Daemon stopped.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
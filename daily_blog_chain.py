@@ -1,24 +1,25 @@
-import subprocess
 import sys
-import os
-
-# Linux paths for GitHub Actions
-PROJECT_DIR = os.getcwd()  # Current repo dir
-VENV_PYTHON = sys.executable  # Python from actions setup
-SCRIPT1 = 'Blog_generator.py'
-SCRIPT2 = 'Automation_Working.py'
-
-def run_script(script_path):
-    result = subprocess.run([VENV_PYTHON, script_path], 
-                          cwd=PROJECT_DIR, 
-                          capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"❌ {script_path} failed: {result.stderr}")
-        sys.exit(1)
-    print(f"✅ {script_path} completed")
+import argparse
+import traceback
+import metrics
+import profiling
+from pipeline import run_pipeline
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scrape, render and publish today's post")
+    parser.add_argument("--profile", nargs="?", const="all", metavar="REGIONS",
+                        help="profile every stage and hot path, or only the comma-separated REGIONS")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
+
     print("🚀 Starting daily Kindle blog automation...")
-    run_script(SCRIPT1)
-    run_script(SCRIPT2)
+    try:
+        run_pipeline()
+    except Exception as e:
+        traceback.print_exc()
+        print(f"❌ Pipeline failed: {e}")
+        sys.exit(1)
+    finally:
+        metrics.export()
     print("🎉 Daily blog post complete!")
@@ -0,0 +1,58 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connect and read timeouts in seconds for every scraper request
+CONNECT_TIMEOUT = float(os.getenv("KINDLE_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("KINDLE_READ_TIMEOUT", "20"))
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# urllib3 only decodes brotli when one of the brotli packages is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+_session = None
+_session_lock = threading.Lock()
+
+def create_session(pool_size=4, headers=None):
+    """
+    Builds a keep-alive session whose connection pool holds pool_size
+    connections per host, so concurrent page fetches reuse TCP/TLS
+    connections instead of handshaking on every request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "Connection": "keep-alive",
+    })
+    if headers:
+        session.headers.update(headers)
+    return session
+
+def get_session(pool_size=4, headers=None):
+    """
+    Returns the process-wide session, creating it on first use.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session(pool_size, headers)
+        return _session
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Where daily_blog_chain.py writes the run's metrics; the Prometheus file is optional
+METRICS_JSON_FILE = os.getenv("KINDLE_METRICS_FILE", "metrics.json")
+METRICS_PROM_FILE = os.getenv("KINDLE_METRICS_PROM_FILE", "")
+
+# Prefix for every exported Prometheus metric name
+PROM_PREFIX = "kindle_"
+
+class Metrics:
+    """
+    Thread-safe, in-process registry of counters, timing/size summaries and
+    per-request events for one run.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters = {}
+        self.summaries = {}
+        self.events = []
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def incr(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self.summaries.get(key)
+            if summary is None:
+                self.summaries[key] = {"count": 1, "sum": value, "min": value, "max": value}
+            else:
+                summary["count"] += 1
+                summary["sum"] += value
+                summary["min"] = min(summary["min"], value)
+                summary["max"] = max(summary["max"], value)
+
+    def event(self, kind, **fields):
+        with self._lock:
+            self.events.append({"kind": kind, "at": round(time.time() - self.started_at, 4), **fields})
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Observes the wall-clock seconds spent in the block, even if it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.counters.clear()
+            self.summaries.clear()
+            self.events.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": time.time() - self.started_at,
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "summaries": [{"name": name, "labels": dict(labels), **summary}
+                              for (name, labels), summary in sorted(self.summaries.items())],
+                "events": list(self.events),
+            }
+
+    def write_json(self, path=METRICS_JSON_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+        return path
+
+    def to_prometheus(self):
+        def series(name, labels):
+            if not labels:
+                return f"{PROM_PREFIX}{name}"
+            rendered = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            return f"{PROM_PREFIX}{name}{{{rendered}}}"
+
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+        for counter in snapshot["counters"]:
+            if counter["name"] not in typed:
+                lines.append(f"# TYPE {PROM_PREFIX}{counter['name']} counter")
+                typed.add(counter["name"])
+            lines.append(f"{series(counter['name'], counter['labels'])} {counter['value']}")
+        by_name = {}
+        for summary in snapshot["summaries"]:
+            by_name.setdefault(summary["name"], []).append(summary)
+        for name, summaries in by_name.items():
+            lines.append(f"# TYPE {PROM_PREFIX}{name} summary")
+            for summary in summaries:
+                lines.append(f"{series(name + '_count', summary['labels'])} {summary['count']}")
+                lines.append(f"{series(name + '_sum', summary['labels'])} {summary['sum']}")
+            lines.append(f"# TYPE {PROM_PREFIX}{name}_max gauge")
+            for summary in summaries:
+                lines.append(f"{series(name + '_max', summary['labels'])} {summary['max']}")
+        lines.append(f"# TYPE {PROM_PREFIX}run_duration_seconds gauge")
+        lines.append(f"{PROM_PREFIX}run_duration_seconds {snapshot['duration_seconds']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=METRICS_PROM_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        return path
+
+# Process-wide registry the pipeline modules report into
+metrics = Metrics()
+
+def export(json_path=METRICS_JSON_FILE, prom_path=METRICS_PROM_FILE):
+    """
+    Writes the run's metrics as JSON and, when a path is set, as Prometheus text.
+    """
+    written = [metrics.write_json(json_path)]
+    if prom_path:
+        written.append(metrics.write_prometheus(prom_path))
+    print(f"📈 Metrics written to {', '.join(written)}")
+    return written
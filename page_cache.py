@@ -0,0 +1,120 @@
+import os
+import gzip
+import time
+import hashlib
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Cache mode: "on" (read and write), "off", "replay" (cache only, never the network),
+# or "refresh" (always fetch, then write)
+CACHE_MODE = os.getenv("KINDLE_CACHE_MODE", "on")
+
+# Directory holding one gzip file per cached page
+CACHE_DIR = os.getenv("KINDLE_CACHE_DIR", ".page_cache")
+
+# Entries older than this are refetched (ignored in replay mode)
+CACHE_TTL = float(os.getenv("KINDLE_CACHE_TTL", str(2 * 60 * 60)))
+
+# Oldest entries are evicted once the cache grows past this size
+CACHE_MAX_BYTES = int(float(os.getenv("KINDLE_CACHE_MAX_MB", "200")) * 1024 * 1024)
+
+def normalize_url(url):
+    """
+    Lower-cases scheme and host, drops the fragment and sorts the query
+    parameters, so the same page always maps to the same cache key.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+def cache_key(url):
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+class PageCache:
+    """
+    On-disk cache of raw page bytes keyed by normalized URL, with a TTL
+    and size-based eviction of the least recently written entries.
+    """
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, mode=CACHE_MODE):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.mode in ("on", "replay", "refresh")
+
+    @property
+    def replay(self):
+        return self.mode == "replay"
+
+    def _path(self, url):
+        return os.path.join(self.directory, f"{cache_key(url)}.html.gz")
+
+    def get(self, url):
+        """
+        Returns the cached bytes for url, or None when missing or expired.
+        """
+        if not self.enabled or self.mode == "refresh":
+            return None
+        path = self._path(url)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if not self.replay and age > self.ttl:
+                os.remove(path)
+                return None
+            with gzip.open(path, 'rb') as f:
+                return f.read()
+        except (OSError, EOFError):
+            return None
+
+    def put(self, url, content):
+        if self.mode not in ("on", "refresh"):
+            return  # Replay never changes what is on disk
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb', compresslevel=5) as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".html.gz"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".html.gz"):
+                    os.remove(entry.path)
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Returns the process-wide cache configured from the environment.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PageCache()
+        return _default_cache
@@ -0,0 +1,113 @@
+import io
+import time
+import Blog_generator
+import Automation_Working
+from artifacts import write_artifacts_in_background
+from seen_books import SeenBookIndex
+from book_store import BOOK_STORE_FILE, BookStore
+from metrics import metrics
+from profiling import profiler
+
+# Default location of the rendered post
+OUTPUT_HTML_FILE = 'output.html'
+
+class PipelineContext:
+    """
+    State handed from stage to stage within one run.
+    """
+    def __init__(self, output_html_file=OUTPUT_HTML_FILE, publish=True, seen_index=None, store=None):
+        self.output_html_file = output_html_file
+        self.publish = publish
+        if store is None and BOOK_STORE_FILE:
+            store = BookStore()
+        self.store = store
+        # The book store keeps the same history, so seen_books.json is only used without it
+        if seen_index is None:
+            seen_index = store if store is not None else SeenBookIndex()
+        self.seen_index = seen_index
+        self.source_pages = []
+        self.pages = []
+        self.books = []
+        self.html_content = None
+        self.parts = []
+        self.publish_results = []
+        self.timings = {}
+
+# ── Stages ─────────────────────────────────────────────────────────────────────
+# Each stage takes the context, does one step and stores its output on it.
+
+def fetch_stage(ctx):
+    # Download and parse the search pages; pagination stops depend on the parsed page
+    ctx.source_pages = Blog_generator.fetch_sources(seen_index=ctx.seen_index)
+    ctx.pages = [page for _, pages in ctx.source_pages for page in pages]
+    if ctx.store is not None:
+        Blog_generator.record_books_in_store(ctx.pages, ctx.store)
+
+def filter_stage(ctx):
+    ctx.books = Blog_generator.filter_sources(ctx.source_pages, ctx.seen_index)
+    print(f"[INFO] Total books found: {len(ctx.books)}")
+
+def render_stage(ctx):
+    if not ctx.books:
+        print("[WARNING] No books matching the filter found. Nothing to render.")
+        return
+    # Render once into memory for publishing, then save the same HTML to disk
+    buffer = io.StringIO()
+    sections = None
+    if Blog_generator.HISTORY_SECTIONS and ctx.store is not None:
+        sections = Blog_generator.history_sections(ctx.books, ctx.store)
+    elif len(ctx.source_pages) > 1:
+        sections = Blog_generator.source_sections(ctx.books)
+    Blog_generator.render_html(ctx.books, buffer, sections)
+    ctx.parts = Blog_generator.shard_sections(sections or [(None, ctx.books)])
+    if len(ctx.parts) > 1:
+        print(f"[INFO] Post split into {len(ctx.parts)} parts.")
+    ctx.html_content = buffer.getvalue()
+    metrics.observe("render_output_bytes", len(ctx.html_content.encode("utf-8")))
+    with open(ctx.output_html_file, 'w', encoding='utf-8') as file:
+        file.write(ctx.html_content)
+    print(f"HTML file generated: {ctx.output_html_file}")
+    Blog_generator.save_parts(ctx.parts)
+    write_artifacts_in_background(ctx.books)
+
+def publish_stage(ctx):
+    if not ctx.publish:
+        print("[INFO] Publishing disabled. Skipping.")
+        return
+    if not ctx.html_content:
+        print("❌ Nothing rendered, skipping publish.")
+        return
+    if len(ctx.parts) > 1:
+        # Parts publish in order; each is rendered with links to the parts already live
+        ctx.publish_results = Automation_Working.publish_parts(
+            lambda k, urls: Blog_generator.render_part(ctx.parts, k, urls), len(ctx.parts))
+    else:
+        ctx.publish_results = Automation_Working.publish_to_blogs(ctx.html_content)
+    unknown = [r["blog_id"] for r in ctx.publish_results if r["action"] == "unknown"]
+    if unknown:
+        print(f"[WARNING] No answer in time from blog(s) {', '.join(unknown)}; check whether the post went live.")
+    failed = [r["blog_id"] for r in ctx.publish_results if r["action"] == "failed"]
+    if failed:
+        raise RuntimeError(f"Publishing failed for blog(s): {', '.join(failed)}")
+
+STAGES = [
+    ("fetch", fetch_stage),
+    ("filter", filter_stage),
+    ("render", render_stage),
+    ("publish", publish_stage),
+]
+
+def run_pipeline(ctx=None, stages=STAGES):
+    """
+    Runs every stage once, in order, in this interpreter. Returns the
+    context with each stage's output and wall-clock time in ctx.timings.
+    """
+    ctx = ctx or PipelineContext()
+    for name, stage in stages:
+        started = time.perf_counter()
+        with profiler.region(f"stage_{name}"):
+            stage(ctx)
+        ctx.timings[name] = time.perf_counter() - started
+        metrics.observe("stage_seconds", ctx.timings[name], stage=name)
+        print(f"✅ {name} completed in {ctx.timings[name]:.2f}s")
+    return ctx
@@ -0,0 +1,228 @@
+import os
+import sys
+import time
+import atexit
+import functools
+import threading
+from contextlib import contextmanager
+
+# Profile the instrumented functions and stages: "all", or a comma-separated list of region names
+PROFILE = os.getenv("KINDLE_PROFILE", "")
+
+# Directory for the .pstats files, allocation reports and collapsed stacks
+PROFILE_DIR = os.getenv("KINDLE_PROFILE_DIR", "profiles")
+
+# Allocation sites listed per region
+PROFILE_TOP = int(os.getenv("KINDLE_PROFILE_TOP", "25"))
+
+# Stack sampling interval for the flamegraph file, in milliseconds
+PROFILE_SAMPLE_MS = float(os.getenv("KINDLE_PROFILE_SAMPLE_MS", "5"))
+
+def _profile_owner():
+    # The thread before 3.12, where each thread can run its own cProfile; the process after
+    return threading.get_ident() if sys.version_info < (3, 12) else None
+
+class Profiler:
+    """
+    Opt-in profiler for named regions. Each region gets a cProfile of the
+    thread running it (merged across calls into <region>.pstats), the
+    allocations made while it ran (<region>.allocations.txt, top sites by
+    size) and its sampled call stacks (stacks.collapsed, in the folded
+    format flamegraph.pl and speedscope read).
+
+    Before Python 3.12 a cProfile sees only the thread that started it, so
+    each thread's outermost region runs its own and a nested region is
+    covered by the outer one's stats. From 3.12 only one cProfile can run
+    in a process at a time, so the outermost region running anywhere owns
+    it and regions entered meanwhile, nested or on worker threads, get no
+    .pstats of their own; they still get allocations and stacks.
+    """
+    def __init__(self, selection=PROFILE, directory=PROFILE_DIR, top=PROFILE_TOP,
+                 sample_interval=PROFILE_SAMPLE_MS / 1000):
+        self.directory = directory
+        self.top = top
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._tracing_depth = 0
+        self._profile_owners = set()
+        self._active = {}
+        self._sampler = None
+        self._registered = False
+        self.stats = {}
+        self.allocations = {}
+        self.stacks = {}
+        self.calls = {}
+        self.seconds = {}
+        self.configure(selection)
+
+    def configure(self, selection):
+        names = {name.strip() for name in (selection or "").split(",") if name.strip()}
+        self.everything = bool(names & {"1", "all", "true"})
+        self.names = names
+
+    @property
+    def enabled(self):
+        return self.everything or bool(self.names)
+
+    def wants(self, name):
+        return self.everything or name in self.names
+
+    @contextmanager
+    def region(self, name):
+        if not self.wants(name):
+            yield
+            return
+        # Loaded only when something is profiled, to keep it off every cold start
+        import tracemalloc
+        entered = False
+        profile = None
+        before = None
+        started = time.perf_counter()
+        try:
+            self._start(name)
+            entered = True
+            profile = self._enable_profile()
+            before = tracemalloc.take_snapshot()
+            started = time.perf_counter()
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    self._profile_owners.discard(_profile_owner())
+            if entered:
+                diffs = tracemalloc.take_snapshot().compare_to(before, "lineno") if before is not None else []
+                self._finish(name, profile, diffs, elapsed)
+
+    def _enable_profile(self):
+        import cProfile
+        owner = _profile_owner()
+        with self._lock:
+            if owner in self._profile_owners:
+                return None
+            self._profile_owners.add(owner)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler (e.g. a debugger or an outer cProfile run) already holds the process
+            print(f"[WARNING] cProfile unavailable, profiling allocations and stacks only: {e}")
+            with self._lock:
+                self._profile_owners.discard(owner)
+            return None
+        return profile
+
+    def _start(self, name):
+        import tracemalloc
+        with self._lock:
+            if not self._registered:
+                atexit.register(self.dump)
+                self._registered = True
+            if self._tracing_depth == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._tracing_depth += 1
+            self._active.setdefault(threading.get_ident(), []).append(name)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+                self._sampler.start()
+
+    def _finish(self, name, profile, diffs, elapsed):
+        import pstats
+        import tracemalloc
+        own_files = (__file__, tracemalloc.__file__)
+        with self._lock:
+            names = self._active.get(threading.get_ident(), [])
+            if names:
+                names.pop()
+            if not names:
+                self._active.pop(threading.get_ident(), None)
+            self._tracing_depth -= 1
+            if self._tracing_depth == 0:
+                tracemalloc.stop()
+            if profile is not None:
+                if name in self.stats:
+                    self.stats[name].add(profile)
+                else:
+                    self.stats[name] = pstats.Stats(profile)
+            sites = self.allocations.setdefault(name, {})
+            for diff in diffs:
+                frame = diff.traceback[0]
+                if frame.filename in own_files or diff.size_diff <= 0:
+                    continue
+                site = sites.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+                site[0] += diff.size_diff
+                site[1] += diff.count_diff
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+
+    def _sample(self):
+        while True:
+            time.sleep(self.sample_interval if self._active else 0.2)
+            frames = sys._current_frames()
+            with self._lock:
+                active = {ident: names[0] for ident, names in self._active.items() if names}
+                for ident, root in active.items():
+                    frame = frames.get(ident)
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    key = ";".join([root] + stack[::-1])
+                    self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def dump(self, directory=None):
+        """
+        Writes everything collected so far and returns the written paths.
+        """
+        directory = directory or self.directory
+        with self._lock:
+            if not self.calls:
+                return []
+            os.makedirs(directory, exist_ok=True)
+            written = []
+            for name, stats in self.stats.items():
+                path = os.path.join(directory, f"{name}.pstats")
+                stats.dump_stats(path)
+                written.append(path)
+            for name, sites in self.allocations.items():
+                path = os.path.join(directory, f"{name}.allocations.txt")
+                ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(f"# {name}: {self.calls[name]} call(s), {self.seconds[name]:.3f}s, "
+                            f"top {len(ranked)} allocation sites by bytes still held at exit\n")
+                    for site, (size, count) in ranked:
+                        f.write(f"{size / 1024:10.1f} KiB {count:8d} blocks  {site}\n")
+                written.append(path)
+            path = os.path.join(directory, "stacks.collapsed")
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            written.append(path)
+        print(f"🔬 Profiles written to {directory}/ ({len(written)} files)")
+        return written
+
+# Process-wide profiler the instrumented functions report into
+profiler = Profiler()
+
+def enable(selection="all"):
+    """
+    Turns profiling on at runtime, e.g. from a --profile flag.
+    """
+    profiler.configure(selection)
+
+def profiled(name):
+    """
+    Decorator running the function inside profiler.region(name). Costs one
+    set lookup per call while profiling is off.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not profiler.wants(name):
+                return fn(*args, **kwargs)
+            with profiler.region(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,138 @@
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# Retry budgets per failure kind, for one page
+CONNECT_RETRIES = int(os.getenv("KINDLE_CONNECT_RETRIES", "3"))
+READ_RETRIES = int(os.getenv("KINDLE_READ_RETRIES", "2"))
+STATUS_RETRIES = int(os.getenv("KINDLE_STATUS_RETRIES", "3"))
+
+# Exponential backoff: full jitter over base * 2**attempt, capped at BACKOFF_MAX
+BACKOFF_BASE = float(os.getenv("KINDLE_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.getenv("KINDLE_BACKOFF_MAX", "30"))
+
+# Longest Retry-After we are willing to wait; anything longer counts as "down"
+MAX_RETRY_AFTER = float(os.getenv("KINDLE_MAX_RETRY_AFTER", "60"))
+
+# Consecutive failed attempts (across all pages) that open the circuit
+BREAKER_THRESHOLD = int(os.getenv("KINDLE_BREAKER_THRESHOLD", "8"))
+
+# Seconds an open circuit waits before letting one trial request through
+BREAKER_RESET_TIMEOUT = float(os.getenv("KINDLE_BREAKER_RESET_TIMEOUT", "300"))
+
+# HTTP statuses worth retrying; anything else that is not 200 fails at once
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class RetryError(RuntimeError):
+    """Raised when a request fails and its retry budget is used up."""
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the upstream looks down and requests are refused up front."""
+
+def parse_retry_after(value, now=None):
+    """
+    Returns the delay in seconds asked for by a Retry-After header, given
+    either as seconds or as an HTTP date, or None if it cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+class RetryPolicy:
+    """
+    Retry settings shared by every request of a run. Budgets are counted
+    separately for connect errors, read errors and retryable HTTP statuses.
+    """
+    def __init__(self, connect_retries=CONNECT_RETRIES, read_retries=READ_RETRIES,
+                 status_retries=STATUS_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 max_retry_after=MAX_RETRY_AFTER, retry_statuses=RETRY_STATUSES):
+        self.budgets = {"connect": connect_retries, "read": read_retries, "status": status_retries}
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = retry_statuses
+
+    def new_attempts(self):
+        return RetryState(self)
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+class RetryState:
+    """
+    Remaining budget and attempt count for one request.
+    """
+    def __init__(self, policy):
+        self.policy = policy
+        self.remaining = dict(policy.budgets)
+        self.attempt = 0
+
+    def next_delay(self, kind, retry_after=None):
+        """
+        Spends one retry of the given kind and returns how long to sleep
+        before the next attempt, or raises RetryError when the budget for
+        that kind is exhausted or the server asks us to wait too long.
+        """
+        if self.remaining.get(kind, 0) <= 0:
+            raise RetryError(f"{kind} retries exhausted after {self.attempt + 1} attempts")
+        self.remaining[kind] -= 1
+        delay = self.policy.backoff(self.attempt)
+        if retry_after is not None:
+            if retry_after > self.policy.max_retry_after:
+                raise RetryError(f"server asked to retry after {retry_after:.0f}s")
+            delay = max(delay, retry_after)
+        self.attempt += 1
+        return delay
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed attempts so the run fails
+    fast instead of burning every page's retry budget against a dead host.
+    After `reset_timeout` seconds one trial request is let through; its
+    success closes the circuit again.
+    """
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def before_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"upstream failed {self.failures} times in a row; not retrying")
+            # Half-open: allow this trial request, reopen on its failure
+            self.opened_at = None
+            self.failures = self.threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                print(f"[ERROR] Circuit breaker opened after {self.failures} consecutive failures.")
@@ -0,0 +1,158 @@
+import os
+import re
+import time
+from typing import List, NamedTuple, Optional
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Parser backend for search pages: "auto" (lxml if installed), "lxml" or "soup"
+PARSER_BACKEND = os.getenv("KINDLE_PARSER_BACKEND", "auto")
+
+# Offer text that marks a book as free to buy
+FREE_OFFER_TEXT = "Or ₹0 to buy"
+
+AMAZON_HOST = "https://www.amazon.in"
+
+# Result containers carry the s-result-item class and the pagination strip its own
+# class, so the restricted soup only ever builds those two subtrees
+_RESTRICTED_CLASSES = re.compile(r"(^|\s)(s-result-item|s-pagination-strip)(\s|$)")
+_RESULT_MARKER = b's-search-result'
+
+def looks_like_search_page(content):
+    """
+    Cheap check that raw bytes are a results page, not e.g. a robot check,
+    which Amazon also serves with a 200.
+    """
+    return _RESULT_MARKER in content
+
+class SearchResult(NamedTuple):
+    title: Optional[str]
+    price: str
+    link: Optional[str]
+    image_url: Optional[str]
+    is_free: bool
+
+class SearchPage(NamedTuple):
+    results: List[SearchResult]
+    last_page: int
+    next_disabled: bool
+
+def _max_page_number(texts):
+    last_page = 1  # Default if we can't find the last page
+    for text in texts:
+        try:
+            last_page = max(last_page, int(text.strip()))
+        except ValueError:
+            continue  # Ignore non-numeric entries like "Next" or "..."
+    return last_page
+
+# ── BeautifulSoup backend ──────────────────────────────────────────────────────
+
+def _soup_results(soup):
+    results = []
+    for container in soup.find_all("div", {"data-component-type": "s-search-result"}):
+        offer_tag = container.find("div", {"data-cy": "secondary-offer-recipe"})
+        title_tag = container.find("h2", {"class": "a-size-medium"})
+        price_tag = container.find("span", {"class": "a-price-whole"})
+        link_tag = container.find("a", {"class": "a-link-normal"}, href=True)
+        image_tag = container.find("img", {"class": "s-image"})
+        results.append(SearchResult(
+            title=title_tag.text.strip() if title_tag else None,
+            price=price_tag.text.strip() if price_tag else "Free",
+            link=f"{AMAZON_HOST}{link_tag['href']}" if link_tag else None,
+            image_url=image_tag.get('src') if image_tag else None,
+            is_free=bool(offer_tag and FREE_OFFER_TEXT in offer_tag.text),
+        ))
+    return results
+
+def _soup_page(soup):
+    pagination = soup.find("span", {"class": "s-pagination-strip"})
+    if pagination:
+        items = pagination.find_all("span", {"class": "s-pagination-item"})
+        last_page = _max_page_number(item.text for item in items)
+    else:
+        last_page = 1  # No pagination found, assume a single page
+    next_disabled = bool(soup.select_one(".s-pagination-next.s-pagination-disabled"))
+    return SearchPage(_soup_results(soup), last_page, next_disabled)
+
+def parse_with_soup(content):
+    """
+    Parses only the result containers and the pagination strip through a
+    SoupStrainer. Falls back to a full tree if the page layout no longer
+    tags results with s-result-item.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer  # Not loaded when lxml does the parsing
+    soup = BeautifulSoup(content, "html.parser", parse_only=SoupStrainer(class_=_RESTRICTED_CLASSES))
+    page = _soup_page(soup)
+    if not page.results and _RESULT_MARKER in content:
+        page = _soup_page(BeautifulSoup(content, "html.parser"))
+    return page
+
+# ── lxml backend ───────────────────────────────────────────────────────────────
+
+def _has_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+_XP_CONTAINERS = '//div[@data-component-type="s-search-result"]'
+_XP_OFFER = './/div[@data-cy="secondary-offer-recipe"]'
+_XP_TITLE = f'.//h2[{_has_class("a-size-medium")}]'
+_XP_PRICE = f'.//span[{_has_class("a-price-whole")}]'
+_XP_LINK = f'.//a[{_has_class("a-link-normal")}][@href]/@href'
+_XP_IMAGE = f'.//img[{_has_class("s-image")}]/@src'
+_XP_PAGE_ITEMS = f'(//span[{_has_class("s-pagination-strip")}])[1]//span[{_has_class("s-pagination-item")}]'
+_XP_NEXT_DISABLED = f'//*[{_has_class("s-pagination-next")} and {_has_class("s-pagination-disabled")}]'
+
+def _first(node, xpath):
+    found = node.xpath(xpath)
+    return found[0] if found else None
+
+def parse_with_lxml(content):
+    tree = lxml_html.fromstring(content, parser=lxml_html.HTMLParser(encoding="utf-8"))
+    results = []
+    for container in tree.xpath(_XP_CONTAINERS):
+        offer_tag = _first(container, _XP_OFFER)
+        title_tag = _first(container, _XP_TITLE)
+        price_tag = _first(container, _XP_PRICE)
+        href = _first(container, _XP_LINK)
+        image_url = _first(container, _XP_IMAGE)
+        results.append(SearchResult(
+            title=title_tag.text_content().strip() if title_tag is not None else None,
+            price=price_tag.text_content().strip() if price_tag is not None else "Free",
+            link=f"{AMAZON_HOST}{href}" if href else None,
+            image_url=str(image_url) if image_url else None,
+            is_free=offer_tag is not None and FREE_OFFER_TEXT in offer_tag.text_content(),
+        ))
+    last_page = _max_page_number(item.text_content() for item in tree.xpath(_XP_PAGE_ITEMS))
+    next_disabled = bool(tree.xpath(_XP_NEXT_DISABLED))
+    return SearchPage(results, last_page, next_disabled)
+
+# ── Entry point ────────────────────────────────────────────────────────────────
+
+def get_backend(name=None):
+    name = name or PARSER_BACKEND
+    if name == "lxml" or (name == "auto" and lxml_html is not None):
+        if lxml_html is None:
+            raise ImportError("lxml backend requested but lxml is not installed")
+        return parse_with_lxml
+    return parse_with_soup
+
+def parse_search_page(content, backend=None):
+    """
+    Extracts every search result (title, price, link, image URL and the
+    free-offer flag) plus the pagination state from raw page bytes in one pass.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return get_backend(backend)(content)
+
+def timed_parse(content, backend=None):
+    """
+    parse_search_page plus its wall-clock seconds, as a module-level
+    function so a process pool can run it.
+    """
+    started = time.perf_counter()
+    page = parse_search_page(content, backend)
+    return page, time.perf_counter() - started
@@ -0,0 +1,75 @@
+import os
+import re
+import json
+import threading
+from datetime import date, timedelta
+from urllib.parse import unquote
+
+# JSON file that remembers every book seen in search results, keyed by ASIN
+SEEN_INDEX_FILE = os.getenv("KINDLE_SEEN_INDEX_FILE", "seen_books.json")
+
+# Sponsored results wrap the product path in an encoded url= parameter, hence the unquote
+_ASIN_PATTERN = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})(?=[/?&]|$)")
+
+def extract_asin(link):
+    """
+    Returns the ASIN from the /dp/<ASIN> part of an Amazon link, or None.
+    """
+    if not link:
+        return None
+    match = _ASIN_PATTERN.search(unquote(link))
+    return match.group(1) if match else None
+
+class SeenBookIndex:
+    """
+    Persistent record of books seen in earlier runs.
+
+    Each entry keeps first_seen / last_seen dates and, for books that were
+    free, the start of their current free streak (free_since) and the last
+    day they were free (last_free). Dates are ISO strings.
+    """
+    def __init__(self, path=SEEN_INDEX_FILE, today=None):
+        self.path = path
+        self.today = (today or date.today()).isoformat()
+        self._lock = threading.Lock()
+        self.books = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.books = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Could not read seen-book index {path}: {e}")
+
+    def __len__(self):
+        return len(self.books)
+
+    def is_known(self, asin):
+        # Books first seen today are not "known", so same-day reruns still crawl them
+        entry = self.books.get(asin)
+        return bool(entry) and entry["first_seen"] < self.today
+
+    def first_seen(self, asin):
+        entry = self.books.get(asin)
+        return entry["first_seen"] if entry else None
+
+    def is_still_free(self, asin):
+        entry = self.books.get(asin)
+        return bool(entry and entry.get("free_since")) and entry["free_since"] < self.today
+
+    def record(self, asin, is_free):
+        # Locked because several sources may be walked at once
+        with self._lock:
+            entry = self.books.setdefault(asin, {"first_seen": self.today})
+            entry["last_seen"] = self.today
+            if is_free:
+                yesterday = (date.fromisoformat(self.today) - timedelta(days=1)).isoformat()
+                if entry.get("last_free") not in (self.today, yesterday):
+                    entry["free_since"] = self.today
+                entry["last_free"] = self.today
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.books, f, separators=(",", ":"), sort_keys=True)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,114 @@
+import os
+import json
+import threading
+from datetime import datetime, timezone
+from metrics import metrics
+
+# JSON file caching access tokens (and the local OAuth refresh token) between runs
+TOKEN_CACHE_FILE = os.getenv("BLOGGER_TOKEN_CACHE_FILE", "token_cache.json")
+
+# Tokens expiring within this many seconds are refreshed ahead of use
+REFRESH_MARGIN = float(os.getenv("BLOGGER_TOKEN_REFRESH_MARGIN", "300"))
+
+def _utcnow():
+    # google-auth keeps expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class TokenCache:
+    """
+    Credential cache in plain JSON, readable only by the owner. Entries
+    are keyed by identity, e.g. "service_account:<email>" or "oauth:local".
+    """
+    def __init__(self, path=TOKEN_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Ignoring unreadable token cache {path}: {e}")
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def store(self, key, creds):
+        """
+        Saves the token and expiry of creds; authorized-user credentials
+        keep their full JSON form so the refresh token survives too.
+        """
+        if hasattr(creds, "to_json") and getattr(creds, "refresh_token", None):
+            entry = json.loads(creds.to_json())
+        else:
+            entry = {"token": creds.token,
+                     "expiry": creds.expiry.isoformat() if creds.expiry else None}
+        with self._lock:
+            self.entries[key] = entry
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+
+def restore_token(creds, entry):
+    """
+    Puts a cached access token back on freshly built credentials so they
+    are usable without a token round-trip while it lasts.
+    """
+    if entry and entry.get("token") and entry.get("expiry"):
+        creds.token = entry["token"]
+        creds.expiry = datetime.fromisoformat(entry["expiry"].rstrip("Z"))
+    return creds
+
+def seconds_left(creds):
+    if not creds.token:
+        return 0.0
+    if creds.expiry is None:
+        return float("inf")
+    return (creds.expiry - _utcnow()).total_seconds()
+
+def ensure_fresh(creds, key, cache, margin=REFRESH_MARGIN):
+    """
+    Refreshes creds when they have no token or expire within margin
+    seconds, and stores the new token. Returns creds.
+    """
+    if seconds_left(creds) <= margin:
+        from google.auth.transport.requests import Request
+        with metrics.timer("blogger_api_seconds", call="token_refresh"):
+            creds.refresh(Request())
+        cache.store(key, creds)
+        print(f"[DEBUG] Access token refreshed, valid until {creds.expiry} UTC")
+    return creds
+
+class TokenRefresher:
+    """
+    Background thread that refreshes credentials `margin` seconds before
+    they expire, so no API call has to wait for a token round-trip.
+    """
+    def __init__(self, creds, key, cache, margin=REFRESH_MARGIN):
+        self.creds = creds
+        self.key = key
+        self.cache = cache
+        self.margin = margin
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="token-refresher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = seconds_left(self.creds) - self.margin
+            if wait == float("inf") or self._stop.wait(max(wait, 0)):
+                return
+            try:
+                ensure_fresh(self.creds, self.key, self.cache, self.margin)
+            except Exception as e:
+                print(f"[WARNING] Background token refresh failed: {e}")
+                if self._stop.wait(min(60, max(self.margin / 2, 1))):
+                    return